@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+#
+# asyncio interface for DotStarAPA102
+# Copyright © 2018  Dave Hocker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# See the LICENSE.md file for more details.
+#
+
+import asyncio
+import inspect
+import time
+from circuitpython_dotstarapa102.animation import Animator
+
+
+class AsyncDotStarAPA102:
+    """
+    asyncio facade for a DotStarAPA102 instance.
+
+    show_async snapshots the pixels on the event loop and transmits them on the
+    string's background transmitter thread (see DotStarAPA102.show_async), which
+    holds the SPIDevice lock for the transfer. The event loop is never blocked
+    by the SPI write.
+
+    Concurrent awaiters are coalesced. While a transfer is in progress, every
+    show_async call waits for one shared follow-up transfer, which snapshots the
+    pixels as they are when the current transfer completes.
+    **Requires Python 3.7 or later.**
+    """
+    def __init__(self, strip):
+        """
+        Initialize an instance of AsyncDotStarAPA102
+
+        :param strip: The DotStarAPA102 instance.
+        """
+        self.strip = strip
+        self.transfers = 0
+        self.coalesced = 0
+        self._current = None
+        self._next = None
+        self._next_args = None
+
+    async def show_async(self, partial=False, force=False):
+        """
+        Transmit the pixels without blocking the event loop.
+
+        :param partial: If True, transmit only the pixels up to the last pixel
+            changed. A coalesced transfer is partial only if every caller asked for it.
+        :param force: If True, transmit even if no pixel has changed.
+        :return: True once the frame has been transmitted (False if it was dropped
+            by the background transmitter's policy).
+        """
+        if self._current is None:
+            return await asyncio.shield(self._begin(partial, force))
+        if self._next is None:
+            self._next = asyncio.get_running_loop().create_future()
+            self._next_args = (partial, force)
+        else:
+            self.coalesced += 1
+            self._next_args = (self._next_args[0] and partial, self._next_args[1] or force)
+        return await asyncio.shield(self._next)
+
+    def _begin(self, partial, force):
+        """
+        Start a transfer on the background transmitter.
+
+        :return: asyncio future of the transfer.
+        """
+        self.transfers += 1
+        self._current = asyncio.wrap_future(self.strip.show_async(partial=partial, force=force))
+        self._current.add_done_callback(self._transfer_done)
+        return self._current
+
+    def _transfer_done(self, _):
+        """
+        Called on the event loop when a transfer completes. Starts the coalesced
+        follow-up transfer, if any.
+        """
+        self._current = None
+        if self._next is None:
+            return
+        waiters = self._next
+        self._next = None
+        try:
+            transfer = self._begin(*self._next_args)
+        except Exception as ex:  # pylint: disable=broad-except
+            waiters.set_exception(ex)
+            return
+        transfer.add_done_callback(lambda done: _copy_result(done, waiters))
+
+    async def close(self):
+        """
+        Wait for transfers in progress and stop the background transmitter.
+
+        :return: None.
+        """
+        while self._current is not None or self._next is not None:
+            await asyncio.shield(self._next or self._current)
+        await asyncio.get_running_loop().run_in_executor(None, self.strip.stop_async)
+
+
+def _copy_result(source, target):
+    """
+    Complete the target future with the outcome of the source future.
+    """
+    if target.cancelled():
+        return
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+class AsyncAnimator(Animator):
+    """
+    Cooperative version of Animator for asyncio applications. Frames are paced
+    with asyncio.sleep against a monotonic deadline and shown with
+    AsyncDotStarAPA102.show_async, so other tasks keep running. The render
+    callback may be a plain function or a coroutine function.
+    """
+    def __init__(self, device, render, fps=30.0, policy="drop", partial=False):
+        """
+        Initialize an instance of AsyncAnimator
+
+        :param device: The AsyncDotStarAPA102 instance to be animated.
+        :param render: Callback render(strip, frame_number), strip is device.strip.
+        :param fps: Target frames per second.
+        :param policy: Late frame policy, "drop" or "catchup" (see Animator).
+        :param partial: Passed to show_async. If True only the changed prefix is transmitted.
+        """
+        super().__init__(device.strip, render, fps=fps, policy=policy, partial=partial)
+        self.device = device
+
+    async def run(self, frames=None, duration=None):
+        """
+        Run the animation until the render callback returns False, the given
+        number of frames has been scheduled or the duration has elapsed.
+
+        :param frames: Number of frames to schedule. None means no limit.
+        :param duration: Run time in seconds. None means no limit.
+        :return: Timing statistics (see Animator.stats).
+        """
+        strip = self.strip
+        start = time.monotonic()
+        frame = 0
+        while frames is None or frame < frames:
+            deadline = start + (frame * self.period)
+            now = time.monotonic()
+            if duration is not None and now - start >= duration:
+                break
+            if now < deadline:
+                await asyncio.sleep(deadline - now)
+                now = time.monotonic()
+            else:
+                frame, deadline = self._skip_late(start, frame, now)
+                if frames is not None and frame >= frames:
+                    break
+                # Let other tasks run even when frames are late
+                await asyncio.sleep(0)
+            self._frame_started(now, now - deadline)
+
+            result = self.render(strip, frame)
+            if inspect.isawaitable(result):
+                result = await result
+            rendered = time.monotonic()
+            await self.device.show_async(partial=self.partial)
+            self._frame_done(now, rendered, time.monotonic())
+            frame += 1
+            if result is False:
+                break
+        return self.stats()
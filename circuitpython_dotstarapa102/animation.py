@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+#
+# Fixed rate animation scheduler for DotStarAPA102
+# Copyright © 2018  Dave Hocker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# See the LICENSE.md file for more details.
+#
+
+import time
+
+
+class Animator:
+    """
+    Runs an animation at a fixed frame rate on a DotStarAPA102 string.
+
+    Frames are scheduled against the monotonic clock, so render and transmit
+    time do not accumulate as drift. The render callback is called with the
+    string and the frame number and should set the pixels for that frame.
+    It may return False to end the animation. The frame number always reflects
+    the schedule, so an effect computed from it runs at the same speed no
+    matter how many frames are dropped.
+
+    Late frame policies
+
+    * drop (when a frame is a full period or more late, the missed frames are skipped)
+    * catchup (every frame is rendered, late frames are shown back to back)
+    """
+    def __init__(self, strip, render, fps=30.0, policy="drop", partial=False):
+        """
+        Initialize an instance of Animator
+
+        :param strip: The DotStarAPA102 instance to be animated.
+        :param render: Callback render(strip, frame_number).
+        :param fps: Target frames per second.
+        :param policy: Late frame policy, "drop" or "catchup".
+        :param partial: Passed to show(). If True only the changed prefix is transmitted.
+        """
+        if fps <= 0:
+            raise ValueError("fps must be greater than 0")
+        if policy not in ("drop", "catchup"):
+            raise ValueError("policy must be 'drop' or 'catchup'")
+        self.strip = strip
+        self.render = render
+        self.period = 1.0 / fps
+        self.policy = policy
+        self.partial = partial
+        self.reset_stats()
+
+    def reset_stats(self):
+        """
+        Reset the timing statistics.
+
+        :return: None.
+        """
+        self._frames = 0
+        self._dropped = 0
+        self._render_time = 0.0
+        self._show_time = 0.0
+        self._lateness = 0.0
+        self._max_lateness = 0.0
+        self._first_start = None
+        self._last_start = None
+
+    def run(self, frames=None, duration=None):
+        """
+        Run the animation until the render callback returns False, the given
+        number of frames has been scheduled or the duration has elapsed.
+
+        :param frames: Number of frames to schedule. None means no limit.
+        :param duration: Run time in seconds. None means no limit.
+        :return: Timing statistics (see stats).
+        """
+        period = self.period
+        strip = self.strip
+        start = time.monotonic()
+        frame = 0
+        while frames is None or frame < frames:
+            deadline = start + (frame * period)
+            now = time.monotonic()
+            if duration is not None and now - start >= duration:
+                break
+            if now < deadline:
+                time.sleep(deadline - now)
+                now = time.monotonic()
+            else:
+                frame, deadline = self._skip_late(start, frame, now)
+                if frames is not None and frame >= frames:
+                    break
+            self._frame_started(now, now - deadline)
+
+            result = self.render(strip, frame)
+            rendered = time.monotonic()
+            strip.show(partial=self.partial)
+            self._frame_done(now, rendered, time.monotonic())
+            frame += 1
+            if result is False:
+                break
+        return self.stats()
+
+    def _skip_late(self, start, frame, now):
+        """
+        Apply the late frame policy to a frame that is due or late.
+
+        :param start: Start time of the animation.
+        :param frame: Number of the next frame.
+        :param now: Current time.
+        :return: (frame number, scheduled time) of the frame to be rendered.
+        """
+        period = self.period
+        deadline = start + (frame * period)
+        if self.policy == "drop" and now - deadline >= period:
+            # Skip to the most recent frame that is due
+            missed = int((now - deadline) / period)
+            self._dropped += missed
+            frame += missed
+            deadline = start + (frame * period)
+        return frame, deadline
+
+    def _frame_done(self, started, rendered, shown):
+        """
+        Accumulate the render and show time of a frame.
+
+        :param started: Time the frame was started.
+        :param rendered: Time rendering completed.
+        :param shown: Time show completed.
+        :return: None.
+        """
+        self._render_time += rendered - started
+        self._show_time += shown - rendered
+
+    def _frame_started(self, now, lateness):
+        """
+        Accumulate the start time statistics of a frame.
+
+        :param now: Frame start time.
+        :param lateness: Seconds between the scheduled and actual start of the frame.
+        :return: None.
+        """
+        if self._first_start is None:
+            self._first_start = now
+        self._last_start = now
+        self._frames += 1
+        self._lateness += lateness
+        if lateness > self._max_lateness:
+            self._max_lateness = lateness
+
+    def stats(self):
+        """
+        Returns the timing statistics of the frames run so far.
+        Times are in milliseconds.
+
+        * frames (frames rendered and shown)
+        * dropped (frames skipped because they were late)
+        * fps (achieved frames per second)
+        * jitter_ms (average lateness of the frame start)
+        * max_jitter_ms (worst lateness of a frame start)
+        * render_ms (average render callback time)
+        * show_ms (average show time)
+
+        :return: Dictionary of statistics.
+        """
+        frames = self._frames
+        fps = 0.0
+        if frames > 1 and self._last_start > self._first_start:
+            fps = (frames - 1) / (self._last_start - self._first_start)
+        divisor = max(frames, 1) / 1000.0
+        return {
+            "frames": frames,
+            "dropped": self._dropped,
+            "fps": fps,
+            "jitter_ms": self._lateness / divisor,
+            "max_jitter_ms": self._max_lateness * 1000.0,
+            "render_ms": self._render_time / divisor,
+            "show_ms": self._show_time / divisor,
+        }
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+#
+# Bulk cross-fade/blend of DotStarAPA102 frames
+# Copyright © 2018  Dave Hocker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# See the LICENSE.md file for more details.
+#
+# Frames are blended in 8.8 fixed point, out = (a * (256 - m) + b * m) >> 8
+# for every byte of the LED frames. The LED frame header bytes are blended too,
+# which blends the per-pixel brightness and always gives a valid header.
+#
+# With NumPy the arithmetic is vectorized. Without NumPy each frame is spread
+# into 16 bit lanes of one Python integer, so the multiplies and the add run
+# over the whole frame as three big integer operations. No lane can overflow
+# (255 * 256 < 65536) and the high byte of each lane is the result.
+#
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def capture(strip):
+    """
+    Returns a copy of the LED frames of a DotStarAPA102 instance, for use
+    as the source or target of a blend.
+
+    :param strip: The DotStarAPA102 instance.
+    :return: bytes of num_pixels * 4 LED frames.
+    """
+    return bytes(strip.px[strip.body_x:strip.end_x])
+
+
+def _mix_factor(mix):
+    """
+    Convert a mix factor to 8.8 fixed point.
+
+    :param mix: Mix factor 0.0 (all source) to 1.0 (all target).
+    :return: Integer 0-256.
+    """
+    if mix < 0.0 or mix > 1.0:
+        raise ValueError("mix must be in the range 0.0-1.0")
+    return int(round(mix * 256))
+
+
+def _spread(frames):
+    """
+    Spread bytes into the 16 bit lanes of an integer.
+
+    :param frames: Buffer of bytes.
+    :return: Integer with byte i of frames in bits 16 * i to 16 * i + 7.
+    """
+    lanes = bytearray(len(frames) * 2)
+    lanes[0::2] = frames
+    return int.from_bytes(lanes, "little")
+
+
+class _Blender:
+    """
+    Blends a fixed source and target frame at any mix factor.
+    Source and target are converted once, each blend is then a few bulk operations.
+    """
+    def __init__(self, source, target, use_numpy=True):
+        if len(source) != len(target):
+            raise ValueError("Source and target frames must be the same size")
+        self.size = len(source)
+        if numpy is not None and use_numpy:
+            self.source = numpy.frombuffer(source, dtype=numpy.uint8).astype(numpy.uint16)
+            self.target = numpy.frombuffer(target, dtype=numpy.uint8).astype(numpy.uint16)
+            self.lanes = None
+        else:
+            self.lanes = (_spread(source), _spread(target))
+
+    def blend_into(self, out, m):
+        """
+        Write the blend of source and target into out.
+
+        :param out: Writable buffer of the frame size (e.g. a slice of px).
+        :param m: Mix factor in 8.8 fixed point, 0-256.
+        :return: None.
+        """
+        if self.lanes is None:
+            result = (self.source * (256 - m) + self.target * m) >> 8
+            numpy.frombuffer(out, dtype=numpy.uint8)[:] = result
+        else:
+            source, target = self.lanes
+            total = (source * (256 - m)) + (target * m)
+            out[:] = total.to_bytes(self.size * 2, "little")[1::2]
+
+
+def blend(strip, target, mix, source=None, use_numpy=True):
+    """
+    Blend two frames into the pixels of a DotStarAPA102 instance in one bulk
+    operation. Both frames are num_pixels * 4 bytes of LED frames, as returned
+    by capture.
+
+    :param strip: The DotStarAPA102 instance receiving the blended frame.
+    :param target: Target frame.
+    :param mix: Mix factor 0.0 (all source) to 1.0 (all target).
+    :param source: Source frame. None means the current pixels of strip.
+    :param use_numpy: If False, do not use NumPy even if it is available.
+    :return: None.
+    """
+    if source is None:
+        source = capture(strip)
+    _Blender(source, target, use_numpy).blend_into(
+        memoryview(strip.px)[strip.body_x:strip.end_x], _mix_factor(mix))
+    strip.mark_dirty()
+
+
+class Fade:
+    """
+    A cross-fade from the current pixels of a DotStarAPA102 instance to a
+    target frame in a given number of steps. Call step() once per frame, e.g.
+    from an Animator render callback, then show().
+    """
+    def __init__(self, strip, target, steps, source=None, use_numpy=True):
+        """
+        Initialize an instance of Fade
+
+        :param strip: The DotStarAPA102 instance to be faded.
+        :param target: Target frame, num_pixels * 4 bytes of LED frames (see capture).
+        :param steps: Number of steps, at least 1. The last step shows the target.
+        :param source: Source frame. None means the current pixels of strip.
+        :param use_numpy: If False, do not use NumPy even if it is available.
+        """
+        if steps < 1:
+            raise ValueError("steps must be at least 1")
+        if source is None:
+            source = capture(strip)
+        self.strip = strip
+        self.steps = steps
+        self.position = 0
+        self._blender = _Blender(source, target, use_numpy)
+
+    @property
+    def done(self):
+        """
+        Returns True when all steps have been taken.
+        """
+        return self.position >= self.steps
+
+    def step(self):
+        """
+        Take the next step of the fade, writing it into the pixels.
+
+        :return: True if there are more steps to take.
+        """
+        if self.done:
+            return False
+        self.position += 1
+        strip = self.strip
+        self._blender.blend_into(memoryview(strip.px)[strip.body_x:strip.end_x],
+                                 (self.position * 256) // self.steps)
+        strip.mark_dirty()
+        return not self.done
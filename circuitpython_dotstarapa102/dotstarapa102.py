@@ -10,7 +10,63 @@
 # See the LICENSE.md file for more details.
 #
 
+import array
+import numbers
+import sys
+from collections import deque
 from adafruit_bus_device import spi_device
+from circuitpython_dotstarapa102.power import PowerLimit, scale_table
+
+# Translate table mapping a 0-31 (or any byte) brightness value to
+# an APA102 LED frame header byte (0b111 + 5 bit brightness)
+_BRIGHTNESS_HEADER = bytes(0xE0 | (v & 0x1F) for v in range(256))
+
+# Bytes per pixel and (brightness, red, green, blue) source offsets
+# for the buffer formats accepted by set_pixels. An offset of None
+# means the value comes from global brightness.
+_PIXEL_FORMATS = {
+    "rgb": (3, None, 0, 1, 2),
+    "rgbx": (4, None, 0, 1, 2),
+    "brgb": (4, 0, 1, 2, 3),
+}
+
+# Cache of color correction tables keyed by (gamma, balance, scale)
+_correction_cache = {}
+
+def _correction_tables(gamma, balance, scale):
+    """
+    Returns the (r, g, b) translate tables for a color correction, building
+    and caching them on first use.
+
+    :param gamma: Gamma exponent, or a (r, g, b) tuple of exponents.
+    :param balance: (r, g, b) tuple of channel weights.
+    :param scale: Overall intensity factor.
+    :return: Tuple of three 256 byte tables.
+    """
+    if isinstance(gamma, (int, float)):
+        gamma = (gamma, gamma, gamma)
+    key = (tuple(gamma), tuple(balance), scale)
+    tables = _correction_cache.get(key)
+    if tables is None:
+        if len(key[0]) != 3 or len(key[1]) != 3:
+            raise ValueError("gamma and balance must have one value per color")
+        tables = tuple(
+            bytes(min(255, int(round(255.0 * scale * weight * ((v / 255.0) ** exponent))))
+                  for v in range(256))
+            for exponent, weight in zip(key[0], key[1]))
+        _correction_cache[key] = tables
+    return tables
+
+def _spidev_bufsiz():
+    """
+    Returns the maximum transfer size of the Linux spidev driver (4096 by default),
+    or 0 if it is not available (e.g. not Linux or spidev not loaded).
+    """
+    try:
+        with open("/sys/module/spidev/parameters/bufsiz") as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return 0
 
 class DotStarAPA102:
     """
@@ -31,7 +87,7 @@ class DotStarAPA102:
     * setBrightness (implemented as global_brightness property)
     * set_pixel_color (was setPixelColor)
     * get_pixel_color (was getPixelColor)
-    * show (transmits all pixels)
+    * show (transmits all pixels, or only the changed prefix)
     * color (deprecated and not implemented, use set_pixel_rgb instead)
     * close (not needed and not implemented. Use deinit() from the busio.SPI object)
     
@@ -41,25 +97,59 @@ class DotStarAPA102:
     * set_pixel_brgb
     * fill_rgb
     * fill_brgb
+    * set_pixels (bulk load of pixels from a buffer)
+    * set_pixels_at (batch of scattered pixels)
+    * mark_dirty (after writing directly into px)
+    * rotate, shift (move pixels within the string)
+    * restamp_brightness (apply a brightness to pixels already set)
+    * show_async, start_async, stop_async (background transmit)
+    * show_body (transmit externally supplied LED frames)
+    * transmit_length (size of px, e.g. for a shared memory buffer)
+    * set_color_correction, clear_color_correction (gamma/white balance tables)
+    * set_power_limit, clear_power_limit (current budget)
+    * add_show_callbacks, remove_show_callbacks
     
     New Properties
 
     * global_brightness (equivalent of setBrightness)
     * num_pixels (numPixels)
+    * frames_sent
+    * frames_skipped
+    * transmitted_body (LED frames of the last frame as sent)
+    * pixels_array (NumPy view of the pixels, requires NumPy)
+    * power_ma (estimated current), frames_limited
+
+    Sequence Protocol
+
+    * len(ds) (number of pixels)
+    * ds[i] (RGB 3-tuple, negative indexes allowed)
+    * ds[i] = color (0xRRGGBB or (r, g, b))
+    * ds[a:b:step] (PixelView over the pixels, not a copy)
+    * ds[a:b:step] = colors (bulk write of a sequence of colors)
 
     Where reasonable and possible follow Adafruit conventions as documented
     at https://circuitpython.readthedocs.io/en/2.x/docs/design_guide.html 
     """
-    def __init__(self, spi, num_px, order='bgr'):
+    def __init__(self, spi, num_px, order='bgr', chunk_size=None, latch_zeros=False,
+                 buffer=None):
         """
         Initialize an instance of DotStarAPA102
 
         :param spi: An SPIDevice instance that defines the SPI bus to be used.
+            None creates an instance that can only render into px (e.g. in a worker
+            process rendering into a shared buffer, see sharedframe). It cannot show.
         :param num_px: Number of pixels in the DotStar/APA102 string.
         :param order: Order of the color components.
+        :param chunk_size: Maximum number of bytes per SPI write. Longer frames are
+            split into several writes within one SPIDevice lock. None means the Linux
+            spidev bufsiz limit if it can be determined. 0 means no limit.
+        :param latch_zeros: If True, the end frame is sent as 0x00 bytes instead of 0xFF bytes.
+        :param buffer: Writable buffer of transmit_length(num_px) bytes to be used as px
+            (e.g. shared memory), or None to allocate px. The start and end frames are
+            written, the LED frames in the buffer are kept.
         """
         # The spi object must be of the correct type
-        if not isinstance(spi, spi_device.SPIDevice):
+        if spi is not None and not isinstance(spi, spi_device.SPIDevice):
             raise ValueError("spi must be <class 'adafruit_bus_device.spi_device.SPIDevice'>")
         
         self.spi = spi
@@ -72,27 +162,64 @@ class DotStarAPA102:
         self.green_x = order.find("g") + 1 # green
         self.red_x = order.find("r") + 1 # red
         self.global_brightness_value = 31
+        if chunk_size is None:
+            chunk_size = _spidev_bufsiz()
+        self.chunk_size = chunk_size
        
         # <Start frame> + <LED data> + <end frame>
         # Start frame = 4 bytes all 0's
         # LED data = 4 * pixels bytes
-        # End frame = 4 bytes all 1's
+        # End frame = all 1's (or all 0's), see latch_length
         # Others have reported that the end frame is not necessary.
         # This implmentation follows the APA102C specification and
         # includes the end frame.
         self.start_x = 0
         self.body_x = self.start_x + 4
         self.end_x = self.body_x + (4 * self.num_px)
+        self.latch_len = self.latch_length(self.num_px)
         # Create trasmit buffer
-        self.px = bytearray(4 + (4 * self.num_px) + 4)
+        # Start frame, all pixels off (brightness 0) and end frame
+        end_frame = (b"\x00" if latch_zeros else b"\xFF") * self.latch_len
+        if buffer is None:
+            self.px = bytearray(4) + (self._led_frame(0, 0, 0, 0) * self.num_px) + \
+                bytearray(end_frame)
+        else:
+            self.px = memoryview(buffer).cast("B")
+            if self.px.readonly or len(self.px) != self.transmit_length(self.num_px):
+                raise ValueError("buffer must be a writable buffer of {0} bytes".format(
+                    self.transmit_length(self.num_px)))
+            self.px[self.start_x:self.body_x] = bytes(4)
+            self.px[self.end_x:] = end_frame
         # print("Pixel buffer length:", len(self.px))
-        # Start and end frames
-        for i in range(4):
-            self.px[i] = 0
-            self.px[i + self.end_x] = 0xFF
-        # Global brightness
-        for i in range(self.body_x, self.body_x + (self.num_px * 4), 4):
-            self.px[i] = 0xE0
+        self._px_view = memoryview(self.px)
+        # A partial show is latched with zero bytes. 0xFF bytes would be
+        # taken as an LED frame by the first pixel that is not sent.
+        self._latch_view = memoryview(bytes(self.latch_len))
+        # High-water mark of changed pixels. Pixels 0 to _dirty_px - 1 must be
+        # sent by a partial show. Initially all pixels are unknown to the string.
+        self._dirty_px = self.num_px
+        # Transmit counters
+        self._frames_sent = 0
+        self._frames_skipped = 0
+        # Background transmitter for show_async, created on demand, and the futures
+        # of the frames it has queued
+        self._transmitter = None
+        self._async_frames = deque()
+        # Color correction tables (r, g, b) and the buffer they are applied into
+        self._correction = None
+        self._tx = None
+        self._tx_view = None
+        # Buffer (px or tx) of the last frame transmitted by show
+        self._sent = self._px_view
+        # Power limit, None when no limit is set. Pixels are written through set_pixel_brgb,
+        # _write_frames, _write_planes or _write_at, which keep its estimate up to date.
+        self._power = None
+        self._frames_limited = 0
+        # NumPy view of the LED frames, created on demand
+        self._pixels_array = None
+        # show() callbacks
+        self._pre_show = []
+        self._post_show = []
     
     @property
     def num_pixels(self):
@@ -102,6 +229,62 @@ class DotStarAPA102:
         :return: Number of pixels in string.
         """
         return self.num_px
+
+    @property
+    def frames_sent(self):
+        """
+        Returns the number of frames transmitted by show(), show_body() and
+        show_async(). Frames queued by show_async() are counted once they have
+        been transmitted.
+
+        :return: Count of transmitted frames.
+        """
+        self._reap_async()
+        return self._frames_sent
+
+    @property
+    def transmitted_body(self):
+        """
+        Returns the LED frames of the last frame transmitted by show() or
+        show_async() as they were sent, after color correction and the power limit.
+        Valid until the next show.
+
+        :return: memoryview of num_pixels * 4 bytes.
+        """
+        return self._sent[self.body_x:self.end_x]
+
+    @property
+    def frames_skipped(self):
+        """
+        Returns the number of show() calls that were skipped because
+        no pixel had changed since the last transmit.
+
+        :return: Count of skipped frames.
+        """
+        return self._frames_skipped
+
+    @property
+    def pixels_array(self):
+        """
+        Returns a NumPy uint8 array of shape (num_pixels, 4) that is a view
+        directly over the LED frames in the transmit buffer (px). Writes to the
+        array change the pixels without any copying. Call mark_dirty() after
+        writing so that show() transmits the change.
+        Column order follows the color order of the string. Use the brightness_x,
+        red_x, green_x and blue_x attributes as column indexes
+        (e.g. ds.pixels_array[:, ds.red_x] = 255). Brightness column values are
+        LED frame headers, 0xE0 + brightness (0-31).
+        **Requires NumPy.**
+
+        :return: numpy.ndarray view of the pixels.
+        """
+        if self._pixels_array is None:
+            # NumPy is optional, only needed if this property is used
+            import numpy
+            self._pixels_array = numpy.frombuffer(
+                self.px, dtype=numpy.uint8, count=self.num_px * 4,
+                offset=self.body_x).reshape((self.num_px, 4))
+        return self._pixels_array
     
     @property
     def global_brightness(self):
@@ -139,6 +322,71 @@ class DotStarAPA102:
             raise ValueError("Pixel value out of range")
         pxx = self.body_x + (pixel * 4)
         return self.px[pxx + self.red_x], self.px[pxx + self.green_x], self.px[pxx + self.blue_x]
+
+    def __len__(self):
+        return self.num_px
+
+    def __getitem__(self, index):
+        """
+        Returns the RGB 3-tuple of a pixel (ds[i]), or a PixelView over a
+        slice of pixels (ds[a:b:step]). Negative indexes count from the end.
+        """
+        if isinstance(index, slice):
+            return PixelView(self, range(*index.indices(self.num_px)))
+        return self.get_pixel_color(self._pixel_index(index))
+
+    def __setitem__(self, index, color):
+        """
+        Set the color of a pixel (ds[i] = color) or a slice of pixels
+        (ds[a:b:step] = colors). A color is either 0xRRGGBB or an (r, g, b) tuple.
+        For a slice, colors is a sequence of colors with one color per pixel,
+        or a bytes-like object of RGB bytes (3 per pixel). The whole slice is
+        written in one bulk operation using global brightness.
+        """
+        if isinstance(index, slice):
+            self._set_range(range(*index.indices(self.num_px)), color)
+        elif isinstance(color, int):
+            self.set_pixel_color(self._pixel_index(index), color)
+        else:
+            self.set_pixel_rgb(self._pixel_index(index), *color)
+
+    def _pixel_index(self, index):
+        """
+        Normalize a sequence index, allowing negative indexes.
+
+        :param index: Pixel index, -num_pixels to num_pixels - 1.
+        :return: Pixel index, 0 to num_pixels - 1.
+        """
+        if index < 0:
+            index += self.num_px
+        if index < 0 or index >= self.num_px:
+            raise IndexError("Pixel index out of range")
+        return index
+
+    def _set_range(self, pixels, colors):
+        """
+        Set the colors of a range of pixels in one bulk operation.
+
+        :param pixels: range of valid pixel indexes.
+        :param colors: Sequence of 0xRRGGBB or (r, g, b) colors, or RGB bytes.
+        :return: None.
+        """
+        count = len(pixels)
+        if isinstance(colors, (bytes, bytearray, memoryview)):
+            data = memoryview(colors).cast("B")
+            if len(data) != count * 3:
+                raise ValueError("Expected {0} bytes of RGB data".format(count * 3))
+            reds, greens, blues = data[0::3], data[1::3], data[2::3]
+        else:
+            colors = [((c >> 16) & 0xFF, (c >> 8) & 0xFF, c & 0xFF) if isinstance(c, int) else c
+                      for c in colors]
+            if len(colors) != count:
+                raise ValueError("Expected {0} colors".format(count))
+            reds = bytes(c[0] for c in colors)
+            greens = bytes(c[1] for c in colors)
+            blues = bytes(c[2] for c in colors)
+        if count:
+            self._write_planes(pixels, None, reds, greens, blues)
     
     def set_pixel_color(self, pixel, color):
         """
@@ -186,11 +434,299 @@ class DotStarAPA102:
             raise ValueError("Pixel value out of range")
         # print(r,g,b)
         pxx = self.body_x + (pixel * 4)
+        power = self._power
+        if power is not None and power.total is not None:
+            px = self.px
+            power.total += power.pixel_units(brightness, r, g, b) - \
+                power.pixel_units(px[pxx + self.brightness_x], px[pxx + self.red_x],
+                                  px[pxx + self.green_x], px[pxx + self.blue_x])
         self.px[pxx + self.brightness_x] = 0xE0 + (brightness & 0x1F) # brightness
         self.px[pxx + self.red_x] = r
         self.px[pxx + self.green_x] = g
         self.px[pxx + self.blue_x] = b
+        if pixel >= self._dirty_px:
+            self._dirty_px = pixel + 1
     
+    @staticmethod
+    def latch_length(count):
+        """
+        Returns the length of the end frame needed to latch a given number of pixels.
+        Each pixel delays the data by half a clock, so count / 2 extra clock
+        edges are needed to push the data to the last pixel. The end frame is
+        never shorter than the 4 bytes given in the APA102C datasheet.
+
+        :param count: Number of pixels transmitted.
+        :return: End frame length in bytes.
+        """
+        return max(4, (count + 15) // 16)
+
+    @classmethod
+    def transmit_length(cls, count):
+        """
+        Returns the length of the transmit buffer (px) for a given number of pixels:
+        start frame, LED frames and end frame.
+
+        :param count: Number of pixels in the string.
+        :return: Buffer length in bytes.
+        """
+        return 4 + (count * 4) + cls.latch_length(count)
+
+    def _led_frame(self, brightness, r, g, b):
+        """
+        Build a single 4 byte LED frame in the color order of the string.
+
+        :param brightness: Brightness value for the pixel, 0-31.
+        :param r: Red value, 0-255.
+        :param g: Green value, 0-255.
+        :param b: Blue value, 0-255.
+        :return: LED frame as a bytearray.
+        """
+        frame = bytearray(4)
+        frame[self.brightness_x] = 0xE0 + (brightness & 0x1F)
+        frame[self.red_x] = r
+        frame[self.green_x] = g
+        frame[self.blue_x] = b
+        return frame
+
+    def set_pixels(self, buffer, fmt="rgb", start=0, step=1):
+        """
+        Set a run of pixels from a buffer in a single bulk operation.
+        The buffer can be any object supporting the buffer protocol
+        (bytes, bytearray, memoryview, array.array, numpy array).
+        Its contents are treated as raw bytes, one group of bytes per pixel.
+
+        :param buffer: Pixel data. The number of pixels set is len(buffer) / bytes per pixel.
+        :param fmt: Layout of the pixel data. "rgb" (3 bytes per pixel), "rgbx" (4 bytes per
+            pixel, the 4th byte is ignored) or "brgb" (4 bytes per pixel, brightness 0-31 first).
+            For "rgb" and "rgbx" the global brightness is used.
+        :param start: Pixel index of the first pixel to be set, 0 to num_pixels - 1.
+        :param step: Pixel index increment between pixels. Works just like range().
+            A negative step sets pixels in descending order from start.
+        :return: Number of pixels set.
+        """
+        try:
+            stride, bx, rx, gx, bluex = _PIXEL_FORMATS[fmt]
+        except KeyError:
+            raise ValueError("fmt must be one of: " + ", ".join(sorted(_PIXEL_FORMATS)))
+        data = memoryview(buffer).cast("B")
+        if len(data) % stride:
+            raise ValueError("Buffer length must be a multiple of {0}".format(stride))
+        count = len(data) // stride
+        pixels = range(start, start + (count * step), step)
+        if not count:
+            return 0
+        if min(pixels[0], pixels[-1]) < 0 or max(pixels[0], pixels[-1]) >= self.num_pixels:
+            raise ValueError("Pixel value out of range")
+        # Extended slices of bytes are much faster than those of a memoryview
+        data = bytes(data)
+        if bx is None:
+            headers = None
+        else:
+            headers = data[bx::stride].translate(_BRIGHTNESS_HEADER)
+        self._write_planes(pixels, headers,
+                           data[rx::stride], data[gx::stride], data[bluex::stride])
+        return count
+
+    def set_pixels_at(self, indices, colors, brightness=None):
+        """
+        Set the colors of a batch of pixels given in any order (e.g. sparkles).
+        The whole batch is validated once and written in a single pass.
+        NumPy fancy indexing is used if indices is a NumPy array.
+
+        :param indices: Sequence or buffer (e.g. array.array, numpy array) of pixel indexes,
+            0 to num_pixels - 1.
+        :param colors: Sequence or array of 0xRRGGBB colors, one per index, or a
+            bytes-like object of RGB bytes (3 per index).
+        :param brightness: Brightness value 0-31 for all pixels, a sequence of brightness
+            values (one per index), or None for global brightness.
+        :return: Number of pixels set.
+        """
+        rgb_bytes = isinstance(colors, (bytes, bytearray, memoryview))
+        if hasattr(indices, "__array_interface__"):
+            return self._set_pixels_at_numpy(indices, colors, brightness, rgb_bytes)
+        count = len(indices)
+        if rgb_bytes:
+            colors = memoryview(colors).cast("B")
+            if len(colors) != count * 3:
+                raise ValueError("Expected {0} bytes of RGB data".format(count * 3))
+        elif len(colors) != count:
+            raise ValueError("Expected {0} colors".format(count))
+        if not count:
+            return 0
+        if min(indices) < 0 or max(indices) >= self.num_pixels:
+            raise ValueError("Pixel value out of range")
+        if brightness is None:
+            brightness = self.global_brightness
+        if isinstance(brightness, numbers.Integral):
+            brightness = int(brightness)
+            if brightness < 0 or brightness > 31:
+                raise ValueError("Brightness must be in the range 0-31")
+            headers = _BRIGHTNESS_HEADER[brightness:brightness + 1] * count
+        else:
+            if len(brightness) != count:
+                raise ValueError("Expected {0} brightness values".format(count))
+            if min(brightness) < 0 or max(brightness) > 31:
+                raise ValueError("Brightness must be in the range 0-31")
+            headers = bytes(bytearray(brightness)).translate(_BRIGHTNESS_HEADER)
+        if rgb_bytes:
+            reds, greens, blues = colors[0::3], colors[1::3], colors[2::3]
+        else:
+            # Packed colors as 4 byte words, low order byte first (blue, green, red, 0)
+            words = array.array("L", colors)
+            if sys.byteorder != "little":
+                words.byteswap()
+            data = memoryview(words).cast("B")
+            size = words.itemsize
+            reds, greens, blues = data[2::size], data[1::size], data[0::size]
+        # Build the LED frames in bulk, then store each one as a single 32 bit word
+        frames = bytearray(count * 4)
+        frames[self.brightness_x::4] = headers
+        frames[self.red_x::4] = reds
+        frames[self.green_x::4] = greens
+        frames[self.blue_x::4] = blues
+        self._write_at(indices, frames, max(indices) + 1)
+        return count
+
+    def _set_pixels_at_numpy(self, indices, colors, brightness, rgb_bytes):
+        """
+        NumPy version of set_pixels_at.
+        """
+        import numpy
+        indices = numpy.asarray(indices).ravel()
+        count = len(indices)
+        if rgb_bytes:
+            rgb = numpy.frombuffer(colors, dtype=numpy.uint8).reshape((-1, 3))
+        else:
+            packed = numpy.asarray(colors, dtype=numpy.uint32).ravel()
+            rgb = numpy.empty((len(packed), 3), dtype=numpy.uint8)
+            rgb[:, 0] = packed >> 16
+            rgb[:, 1] = packed >> 8
+            rgb[:, 2] = packed
+        if len(rgb) != count:
+            raise ValueError("Expected {0} colors".format(count))
+        if not count:
+            return 0
+        if indices.min() < 0 or indices.max() >= self.num_pixels:
+            raise ValueError("Pixel value out of range")
+        if brightness is None:
+            brightness = self.global_brightness
+        brightness = numpy.asarray(brightness)
+        if brightness.min() < 0 or brightness.max() > 31:
+            raise ValueError("Brightness must be in the range 0-31")
+        frames = numpy.empty(count * 4, dtype=numpy.uint8)
+        frames[self.brightness_x::4] = 0xE0 | brightness
+        frames[self.red_x::4] = rgb[:, 0]
+        frames[self.green_x::4] = rgb[:, 1]
+        frames[self.blue_x::4] = rgb[:, 2]
+        self._write_at(indices, frames, int(indices.max()) + 1)
+        return count
+
+    def restamp_brightness(self, brightness=None, start=0, end=None):
+        """
+        Set the brightness of a slice of pixels without changing their colors,
+        e.g. to apply a new global brightness to pixels that are already set.
+        The default start/end parameters define the entire set of pixels.
+
+        :param brightness: Brightness value, 0-31. None means global brightness.
+        :param start: Starting pixel index, 0 to num_pixels - 1.
+        :param end: Ending pixel index. 1 to num_pixels. Works just like range().
+            A value of None means num_pixels.
+        :return: None.
+        """
+        if brightness is None:
+            brightness = self.global_brightness
+        elif brightness < 0 or brightness > 31:
+            raise ValueError("Global brightness must be in the range 0-31")
+        if end is None:
+            end = self.num_pixels
+        if start < 0 or end > self.num_pixels:
+            raise ValueError("Pixel value out of range")
+        if end <= start:
+            return
+        self._write_planes(range(start, end),
+                           _BRIGHTNESS_HEADER[brightness:brightness + 1] * (end - start))
+
+    def _write_planes(self, pixels, headers, reds=None, greens=None, blues=None):
+        """
+        Write color planes into the LED frames of a run of pixels.
+        Each plane is written with one extended slice assignment.
+
+        :param pixels: A non-empty range of valid pixel indexes (any step).
+        :param headers: LED frame header bytes (0xE0 + brightness), one per pixel.
+            None means global brightness.
+        :param reds: Red values, one byte per pixel. None leaves the red values unchanged.
+        :param greens: Green values, one byte per pixel. None leaves them unchanged.
+        :param blues: Blue values, one byte per pixel. None leaves them unchanged.
+        :return: None.
+        """
+        count = len(pixels)
+        if headers is None:
+            headers = _BRIGHTNESS_HEADER[self.global_brightness:self.global_brightness + 1] * count
+        step = pixels.step * 4
+        first = self.body_x + (pixels[0] * 4)
+        # Stop one byte beyond the last frame written (in the direction of step)
+        stop = self.body_x + (pixels[-1] * 4) + (1 if step > 0 else -1)
+        px = self.px
+        power = self._power
+        tracked = power is not None and power.total is not None
+        if tracked:
+            if count == self.num_px:
+                # Every pixel is replaced
+                power.total = 0
+            else:
+                power.total -= power.units(self._px_view, first, stop, step)
+        for x, plane in ((self.brightness_x, headers), (self.red_x, reds),
+                         (self.green_x, greens), (self.blue_x, blues)):
+            if plane is not None:
+                px[first + x:stop + x:step] = plane
+        if tracked:
+            power.total += power.units(self._px_view, first, stop, step)
+        self._changed(max(pixels[0], pixels[-1]) + 1)
+
+    def _write_frames(self, start, frames):
+        """
+        Write a run of LED frames into consecutive pixels.
+
+        :param start: Pixel index of the first LED frame, 0 to num_pixels - 1.
+        :param frames: Bytes-like object of LED frames in the color order of the string.
+        :return: None.
+        """
+        first = self.body_x + (start * 4)
+        stop = first + len(frames)
+        power = self._power
+        if power is not None and power.total is not None:
+            power.total += power.units(frames) - power.units(self._px_view, first, stop)
+        self._px_view[first:stop] = frames
+        self._changed(start + (len(frames) // 4))
+
+    def _write_at(self, indices, frames, end):
+        """
+        Write LED frames into pixels given in any order, each as a single 32 bit word.
+        If an index is repeated, its last LED frame is kept.
+
+        :param indices: Sequence or NumPy array of valid pixel indexes.
+        :param frames: Buffer of LED frames, one per index.
+        :param end: One past the highest index.
+        :return: None.
+        """
+        body = self._px_view[self.body_x:self.end_x].cast("I")
+        numpy_indices = hasattr(indices, "__array_interface__")
+        power = self._power
+        tracked = power is not None and power.total is not None
+        if tracked:
+            unique = set(indices.tolist() if numpy_indices else indices)
+            power.total -= power.units(array.array("I", map(body.__getitem__, unique)))
+        if numpy_indices:
+            import numpy
+            numpy.frombuffer(body, dtype=numpy.uint32)[indices] = \
+                numpy.frombuffer(frames, dtype=numpy.uint32)
+        else:
+            for pixel, frame in zip(indices, memoryview(frames).cast("I")):
+                body[pixel] = frame
+        if tracked:
+            power.total += power.units(array.array("I", map(body.__getitem__, unique)))
+        self._changed(end)
+
     def fill_rgb(self, r, g, b, start=0, end=None):
         """
         Fill a slice of pixels with a color. The default start/end parameters
@@ -220,19 +756,443 @@ class DotStarAPA102:
         """
         if not end:
             end = self.num_pixels
-        for i in range(start, end):
-            self.set_pixel_brgb(i, brightness, r, g, b)
+        if end <= start:
+            return
+        if start < 0 or end > self.num_pixels:
+            raise ValueError("Pixel value out of range")
+        # Replicate one LED frame across the slice
+        self._write_frames(start, self._led_frame(brightness, r, g, b) * (end - start))
             
-    def show(self):
+    def set_color_correction(self, gamma=1.0, balance=(1.0, 1.0, 1.0), scale=1.0):
+        """
+        Set a color correction that is applied to all pixels when they are transmitted.
+        The stored pixel colors (e.g. as returned by get_pixel_color) are not changed.
+        Each channel is corrected as 255 * scale * balance * (value / 255) ** gamma
+        through a precomputed 256 entry table. Tables are cached, so switching
+        between correction profiles is free after the first use of a profile.
+
+        :param gamma: Gamma exponent, or a (r, g, b) tuple of exponents. 1.0 is linear.
+        :param balance: White balance, a (r, g, b) tuple of channel weights.
+        :param scale: Overall intensity factor applied to all channels.
+        :return: None.
+        """
+        self._correction = _correction_tables(gamma, balance, scale)
+        if self._power is not None:
+            self._power.set_correction(self._correction)
+        self._need_tx()
+        self._changed()
+
+    def _need_tx(self):
+        """
+        Create the separate transmit buffer used by color correction and the power limit.
+
+        :return: None.
+        """
+        if self._tx is None:
+            self._tx = bytearray(self.px)
+            self._tx_view = memoryview(self._tx)
+
+    def clear_color_correction(self):
+        """
+        Remove the color correction. Pixels are transmitted as stored.
+
+        :return: None.
+        """
+        self._correction = None
+        if self._power is not None:
+            self._power.set_correction(None)
+        self._changed()
+
+    def set_power_limit(self, max_ma, ma_per_channel=(20.0, 20.0, 20.0), idle_ma=0.0):
+        """
+        Limit the estimated current drawn by the string. The estimate is kept up to
+        date as pixels are set, so checking it at show time costs nothing. When it
+        exceeds max_ma, the colors of the transmitted frame are scaled down in bulk
+        to fit. The stored pixel colors are not changed. Each channel draws
+        ma_per_channel * (value / 255) * (brightness / 31), with the values after
+        color correction (see set_color_correction). After writing directly into px (e.g. through
+        pixels_array) call mark_dirty(), the estimate is then recounted at the next show.
+
+        :param max_ma: Current budget in mA for the whole string.
+        :param ma_per_channel: (r, g, b) current in mA of a channel at full value and brightness.
+        :param idle_ma: Current in mA drawn by each pixel when it is off.
+        :return: None.
+        """
+        self._power = PowerLimit((self.brightness_x, self.red_x, self.green_x, self.blue_x),
+                                 self.num_px, max_ma, ma_per_channel, idle_ma, self._correction)
+        self._need_tx()
+        self._changed()
+
+    def clear_power_limit(self):
+        """
+        Remove the power limit. Pixels are transmitted at their stored colors.
+
+        :return: None.
+        """
+        self._power = None
+        self._changed()
+
+    @property
+    def power_ma(self):
+        """
+        Returns the estimated current in mA drawn by the pixels, after color correction
+        but before the power limit is applied, or None if no power limit is set.
+
+        :return: Estimated current in mA.
+        """
+        if self._power is None:
+            return None
+        return self._power.ma(self._power_units())
+
+    @property
+    def frames_limited(self):
+        """
+        Returns the number of frames that were scaled down by the power limit.
+
+        :return: Count of limited frames.
+        """
+        return self._frames_limited
+
+    def _power_units(self):
+        """
+        Returns the power estimate of the stored pixels, counting them if it is stale.
+        """
+        power = self._power
+        if power.total is None:
+            power.total = power.units(self._px_view, self.body_x, self.end_x)
+        return power.total
+
+    def rotate(self, n, start=0, end=None):
+        """
+        Rotate a slice of pixels by n positions. Pixels moved beyond the end of
+        the slice reappear at its start. The default start/end parameters define
+        the entire set of pixels.
+
+        :param n: Number of positions. Positive values move pixels towards higher indexes.
+        :param start: Starting pixel index, 0 to num_pixels - 1.
+        :param end: Ending pixel index. 1 to num_pixels. Works just like range().
+            A value of None means num_pixels.
+        :return: None.
         """
-        Transmit all pixels to the DotStar/APA102 string.
+        if end is None:
+            end = self.num_pixels
+        if start < 0 or end > self.num_pixels:
+            raise ValueError("Pixel value out of range")
+        if end - start < 2:
+            return
+        n %= end - start
+        if not n:
+            return
+        first = self.body_x + (start * 4)
+        last = self.body_x + (end * 4)
+        split = last - (n * 4)
+        # The pixels only move, so the power estimate is unchanged
+        self.px[first:last] = bytes(self._px_view[split:last]) + self._px_view[first:split]
+        self._changed(end)
+
+    def shift(self, n, fill=0, start=0, end=None):
+        """
+        Shift a slice of pixels by n positions. Pixels moved beyond the end of
+        the slice are lost, vacated pixels are set to the fill color using global
+        brightness. The default start/end parameters define the entire set of pixels.
+
+        :param n: Number of positions. Positive values move pixels towards higher indexes.
+        :param fill: Color of the vacated pixels, 0xRRGGBB or (r, g, b). Default is off.
+        :param start: Starting pixel index, 0 to num_pixels - 1.
+        :param end: Ending pixel index. 1 to num_pixels. Works just like range().
+            A value of None means num_pixels.
+        :return: None.
+        """
+        if end is None:
+            end = self.num_pixels
+        if start < 0 or end > self.num_pixels:
+            raise ValueError("Pixel value out of range")
+        if end <= start or not n:
+            return
+        count = min(abs(n), end - start)
+        if isinstance(fill, int):
+            fill = ((fill >> 16) & 0xFF, (fill >> 8) & 0xFF, fill & 0xFF)
+        frames = self._led_frame(self.global_brightness, *fill) * count
+        first = self.body_x + (start * 4)
+        last = self.body_x + (end * 4)
+        if n > 0:
+            self._write_frames(start, frames + self._px_view[first:last - (count * 4)])
+        else:
+            self._write_frames(start, bytes(self._px_view[first + (count * 4):last]) + frames)
+
+    def mark_dirty(self, end=None):
+        """
+        Record that pixels have been changed by writing directly into the
+        transmit buffer (px). The setter and fill methods do this automatically.
+        With a power limit set, the power estimate is recounted at the next show.
+
+        :param end: One past the last pixel changed, 1 to num_pixels. None means num_pixels.
+        :return: None.
+        """
+        # The running power estimate cannot follow direct writes
+        if self._power is not None:
+            self._power.total = None
+        self._changed(end)
 
+    def _changed(self, end=None):
+        """
+        Record that pixels up to end have been changed by a method of this class.
+
+        :param end: One past the last pixel changed, 1 to num_pixels. None means num_pixels.
+        :return: None.
+        """
+        if end is None:
+            end = self.num_pixels
+        if end > self._dirty_px:
+            self._dirty_px = end
+
+    def show(self, partial=False, force=False):
+        """
+        Transmit all pixels to the DotStar/APA102 string. If no pixel
+        has changed since the last transmit nothing is sent.
+
+        :param partial: If True, transmit only the pixels up to the last pixel
+            changed since the previous show. Pixels beyond it hold their current state.
+        :param force: If True, transmit even if no pixel has changed.
         :return: True if successful.
         """
         # print(self.px)
-        with self.spi as spi:
-            spi.write(self.px, start=0, end=len(self.px))
+        for callback in self._pre_show:
+            callback(self)
+        buffers = self._frame_buffers(partial, force)
+        if buffers:
+            self._transmit(*buffers)
+            self._dirty_px = 0
+            self._frames_sent += 1
+            for callback in self._post_show:
+                callback(self)
+        return True
+
+    def show_body(self, body):
+        """
+        Transmit externally supplied LED frames (e.g. a recorded frame) in place
+        of the pixels in px. The body is sent as is, between the start and end
+        frames of this string, with no color correction. If a power limit is set,
+        the body is scaled down like px would be. px is not changed, but the next
+        show() transmits all of px.
+
+        :param body: Buffer of num_pixels * 4 bytes of LED frames in the color order
+            of the string.
+        :return: True if successful.
+        """
+        if len(body) != self.end_x - self.body_x:
+            raise ValueError("Body must be {0} bytes".format(self.end_x - self.body_x))
+        if self.spi is None:
+            raise RuntimeError("This instance has no SPI device and can only render")
+        if self._power is not None:
+            level = self._power.limit_level(self._power.units(body, corrected=False))
+            if level < 256:
+                self._frames_limited += 1
+                scale = scale_table(level)
+                self._tx[self.body_x:self.end_x] = body
+                body = self._corrected_view(self.num_px, (scale, scale, scale),
+                                            self._tx_view)[self.body_x:self.end_x]
+        self._transmit(self._px_view[:self.body_x], body, self._px_view[self.end_x:])
+        self._frames_sent += 1
+        # The string no longer shows px
+        self._dirty_px = self.num_px
         return True
+
+    def show_async(self, partial=False, force=False):
+        """
+        Snapshot the pixels and transmit them from a background thread. The caller
+        can render the next frame while the snapshot is being transmitted.
+        The background transmitter is started with default settings on first use
+        (see start_async). **Requires threading support (CPython).**
+
+        :param partial: If True, transmit only the pixels up to the last pixel
+            changed since the previous show.
+        :param force: If True, transmit even if no pixel has changed.
+        :return: A concurrent.futures.Future. Its result is True once the frame has been
+            transmitted, or False if the frame was dropped because the transmitter was busy.
+            If the transmit fails the future holds the exception, and the next show
+            transmits all pixels again.
+        """
+        if self._transmitter is None:
+            self.start_async()
+        for callback in self._pre_show:
+            callback(self)
+        buffers = self._frame_buffers(partial, force)
+        if not buffers:
+            return self._transmitter.done(True)
+        queued, future = self._transmitter.submit(*buffers)
+        if queued:
+            self._dirty_px = 0
+            self._async_frames.append(future)
+            for callback in self._post_show:
+                callback(self)
+        return future
+
+    def _reap_async(self):
+        """
+        Account for the frames the background transmitter has finished, in order.
+        The pixels of a frame that failed are transmitted again by the next show.
+
+        :return: None.
+        """
+        frames = self._async_frames
+        while frames and frames[0].done():
+            future = frames.popleft()
+            if future.cancelled() or future.exception() is not None:
+                self._changed()
+            else:
+                self._frames_sent += 1
+
+    def start_async(self, buffers=2, policy="block", timeout=None):
+        """
+        Start (or restart) the background transmitter used by show_async.
+
+        :param buffers: Number of frame snapshots that can be queued or in transmission.
+            2 gives classic double buffering.
+        :param policy: What show_async does when all snapshot buffers are busy.
+            "block" waits for a buffer, "drop" drops the new frame.
+        :param timeout: Maximum time in seconds to block waiting for a buffer. None waits forever.
+        :return: The BackgroundTransmitter instance.
+        """
+        # Imported here so the driver does not require threading support
+        from circuitpython_dotstarapa102.transmitter import BackgroundTransmitter
+        self.stop_async()
+        self._transmitter = BackgroundTransmitter(
+            self, buffers=buffers, policy=policy, timeout=timeout)
+        return self._transmitter
+
+    def stop_async(self):
+        """
+        Wait for all queued frames to be transmitted and stop the background transmitter.
+
+        :return: None.
+        """
+        if self._transmitter is not None:
+            self._transmitter.close()
+            self._transmitter = None
+            self._reap_async()
+
+    def _frame_buffers(self, partial, force):
+        """
+        Determine what needs to be sent for the current frame.
+
+        :param partial: If True, only the changed prefix of the pixels is sent.
+        :param force: If True, the frame is sent even if no pixel has changed.
+        :return: Tuple of buffers to be transmitted, or None if the frame is skipped.
+        """
+        if self.spi is None:
+            raise RuntimeError("This instance has no SPI device and can only render")
+        self._reap_async()
+        count = self._dirty_px
+        if not count and not force:
+            self._frames_skipped += 1
+            return None
+        partial = partial and count
+        if not partial:
+            count = self.num_px
+        view = self._px_view
+        tables = self._correction
+        if self._power is not None:
+            level = self._power.limit_level(self._power_units())
+            if level != self._power.level:
+                # Send every pixel, those beyond a partial frame were sent at the old level
+                self._power.level = level
+                partial = False
+                count = self.num_px
+            if level < 256:
+                self._frames_limited += 1
+                scale = scale_table(level)
+                if tables is None:
+                    tables = (scale, scale, scale)
+                else:
+                    tables = tuple(table.translate(scale) for table in tables)
+        if tables is not None:
+            view = self._corrected_view(count, tables)
+        self._sent = view
+        if partial:
+            return (view[:self.body_x + (count * 4)],
+                    self._latch_view[:self.latch_length(count)])
+        return (view,)
+
+    def _corrected_view(self, count, tables, source=None):
+        """
+        Apply color translate tables (color correction and/or power limit) to the
+        first count pixels. The result goes to a separate transmit buffer,
+        px is not changed.
+
+        :param count: Number of pixels to be corrected.
+        :param tables: (r, g, b) translate tables.
+        :param source: Transmit buffer holding the pixels to be corrected. None means px.
+        :return: memoryview of the corrected transmit buffer.
+        """
+        start = self.body_x
+        end = start + (count * 4)
+        px = self._px_view if source is None else source
+        tx = self._tx
+        red, green, blue = tables
+        tx[start + self.brightness_x:end:4] = px[start + self.brightness_x:end:4]
+        tx[start + self.red_x:end:4] = bytes(px[start + self.red_x:end:4]).translate(red)
+        tx[start + self.green_x:end:4] = bytes(px[start + self.green_x:end:4]).translate(green)
+        tx[start + self.blue_x:end:4] = bytes(px[start + self.blue_x:end:4]).translate(blue)
+        return self._tx_view
+
+    def add_show_callbacks(self, pre_show=None, post_show=None):
+        """
+        Register callbacks around show() and show_async(). Both are called
+        with the DotStarAPA102 instance as the only argument. pre_show is called
+        before the frame is prepared and may still change pixels. post_show is
+        called after a frame has been transmitted (or queued by show_async),
+        but not when show() skips an unchanged frame.
+
+        :param pre_show: Callback called before each show, or None.
+        :param post_show: Callback called after each transmitted frame, or None.
+        :return: None.
+        """
+        if pre_show is not None:
+            self._pre_show.append(pre_show)
+        if post_show is not None:
+            self._post_show.append(post_show)
+
+    def remove_show_callbacks(self, pre_show=None, post_show=None):
+        """
+        Remove callbacks registered with add_show_callbacks.
+
+        :param pre_show: Callback to be removed, or None.
+        :param post_show: Callback to be removed, or None.
+        :return: None.
+        """
+        if pre_show is not None:
+            self._pre_show.remove(pre_show)
+        if post_show is not None:
+            self._post_show.remove(post_show)
+
+    def _transmit(self, *buffers):
+        """
+        Write one or more buffers to the SPI device under a single lock.
+
+        :param buffers: Buffers (usually memoryview slices) to be written in order.
+        :return: None.
+        """
+        with self.spi as spi:
+            for buf in buffers:
+                self._write(spi, buf)
+
+    def _write(self, spi, buf):
+        """
+        Write a buffer to a locked SPI bus in chunks of at most chunk_size bytes.
+
+        :param spi: The locked SPI bus.
+        :param buf: Buffer to be written.
+        :return: None.
+        """
+        chunk = self.chunk_size
+        if not chunk or len(buf) <= chunk:
+            spi.write(buf)
+        else:
+            # Split into transfers the SPI driver accepts, without copying
+            view = memoryview(buf)
+            for x in range(0, len(view), chunk):
+                spi.write(view[x:x + chunk])
     
     def clear(self, show=True):
         """
@@ -245,3 +1205,43 @@ class DotStarAPA102:
         if show:
             return self.show()
         return True
+
+
+class PixelView:
+    """
+    A lightweight view over a slice of the pixels of a DotStarAPA102
+    instance, as returned by ds[a:b:step]. No pixel data is copied. Reading and
+    writing through the view (including slicing the view) reads and writes the
+    underlying pixels.
+    """
+    def __init__(self, strip, pixels):
+        """
+        Initialize an instance of PixelView
+
+        :param strip: The DotStarAPA102 instance.
+        :param pixels: range of pixel indexes covered by the view.
+        """
+        self.strip = strip
+        self.pixels = pixels
+
+    def __len__(self):
+        return len(self.pixels)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PixelView(self.strip, self.pixels[index])
+        return self.strip[self.pixels[index]]
+
+    def __setitem__(self, index, color):
+        if isinstance(index, slice):
+            self.strip._set_range(self.pixels[index], color)
+        else:
+            self.strip[self.pixels[index]] = color
+
+    def __iter__(self):
+        strip = self.strip
+        for pixel in self.pixels:
+            yield strip.get_pixel_color(pixel)
+
+    def __repr__(self):
+        return "PixelView({0})".format(list(self))
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+#
+# HDR (16 bit per channel) pixel input for APA102/DotStar strips/strings
+# Copyright © 2018  Dave Hocker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# See the LICENSE.md file for more details.
+#
+# A 16 bit channel value c at 5 bit brightness b is encoded as the 8 bit value
+# (c * scale[b] + 0x8000) >> 16, where scale[b] = 31 * 65536 / (b * 257). The
+# brightness of a pixel is the smallest one that keeps its brightest channel
+# within 0-255, looked up by the high byte of that channel. The encoded pixels
+# are written with one set_pixels call in "brgb" format.
+#
+
+import operator
+import sys
+
+# HDR tables, built on first use (see _hdr_tables)
+_hdr_cache = []
+
+
+def _hdr_tables():
+    """
+    Returns the HDR encoding tables, building them on first use.
+
+    :return: (levels, scales, colors). levels maps the high byte of the brightest
+        channel to a brightness (1-31), scales maps a brightness to its scale
+        factor and colors maps a brightness to its encoding table (see _hdr_colors).
+    """
+    if not _hdr_cache:
+        scales = [0] * 32
+        for brightness in range(1, 32):
+            scales[brightness] = int(round((31 * 65536.0) / (brightness * 257)))
+        levels = bytearray(256)
+        brightness = 1
+        for high in range(256):
+            # Largest channel value that maps to this entry
+            value = (high << 8) | 0xFF
+            while ((value * scales[brightness]) + 0x8000) >> 16 > 255:
+                brightness += 1
+            levels[high] = brightness
+        _hdr_cache.append((bytes(levels), scales, [None] * 32))
+    return _hdr_cache[0]
+
+
+def _hdr_colors(brightness):
+    """
+    Returns the table encoding 16 bit channel values at a brightness, building
+    it on first use. The table covers every value that can be encoded at that
+    brightness (2114 per brightness step).
+
+    :param brightness: Brightness value, 1-31.
+    :return: bytes mapping a 16 bit value to its 8 bit value.
+    """
+    _, scales, colors = _hdr_tables()
+    table = colors[brightness]
+    if table is None:
+        scale = scales[brightness]
+        # Value v encodes as e from the first v with (v * scale + 0x8000) >> 16 == e,
+        # so the table is 256 runs of equal bytes
+        firsts = [min(0x10000, max(0, -(-((e << 16) - 0x8000) // scale))) for e in range(257)]
+        table = b"".join(bytes((e,)) * (firsts[e + 1] - firsts[e]) for e in range(256))
+        colors[brightness] = table
+    return table
+
+
+def _byte_max(*planes):
+    """
+    Returns the bytewise maximum of equal length byte buffers. Each buffer is
+    spread into the 16 bit lanes of one Python integer and compared with a few
+    big integer operations: bit 8 of a lane of (a | 0x100) - b is set where a >= b.
+
+    :param planes: Buffers of bytes.
+    :return: bytes of the maximum of each position.
+    """
+    count = len(planes[0])
+    lanes = bytearray(count * 2)
+    bit8 = int.from_bytes(b"\x00\x01" * count, "little")
+    low = int.from_bytes(b"\xFF\x00" * count, "little")
+    result = None
+    for plane in planes:
+        lanes[0::2] = plane
+        value = int.from_bytes(lanes, "little")
+        if result is None:
+            result = value
+        else:
+            mask = ((((result | bit8) - value) & bit8) >> 8) * 0xFF
+            result = (result & mask) | (value & (low ^ mask))
+    return result.to_bytes(count * 2, "little")[0::2]
+
+
+def set_pixels_hdr(strip, buffer, start=0):
+    """
+    Set a run of pixels of a DotStarAPA102 instance from 16 bit per channel
+    (r, g, b) colors. For each pixel the 5 bit brightness field and 8 bit color
+    values are chosen to give the best resolution, which greatly improves the
+    dim end of the range. 0xFFFF is full brightness (31) and full color (255).
+    Global brightness is not used. The encoding uses precomputed tables (built
+    on first use) and is applied to the whole run with bulk operations,
+    vectorized if buffer is a NumPy array.
+
+    :param strip: The DotStarAPA102 instance.
+    :param buffer: Buffer of unsigned 16 bit values, 3 per pixel (e.g. array.array("H")
+        or a numpy uint16 array).
+    :param start: Pixel index of the first pixel to be set, 0 to num_pixels - 1.
+    :return: Number of pixels set.
+    """
+    levels, scales, colors = _hdr_tables()
+    if hasattr(buffer, "__array_interface__"):
+        return _set_pixels_hdr_numpy(strip, buffer, start, levels, scales)
+    values = memoryview(buffer).cast("B").cast("H")
+    if len(values) % 3:
+        raise ValueError("Buffer length must be a multiple of 3 values")
+    count = len(values) // 3
+    if start < 0 or start + count > strip.num_pixels:
+        raise ValueError("Pixel value out of range")
+    if not count:
+        return 0
+    # High bytes of the r, g and b values
+    data = values.cast("B")
+    high = 1 if sys.byteorder == "little" else 0
+    brightness = _byte_max(data[high::6], data[high + 2::6],
+                           data[high + 4::6]).translate(levels)
+    # One encoding table per pixel, chosen by its brightness
+    for level in set(brightness):
+        _hdr_colors(level)
+    tables = list(map(colors.__getitem__, brightness))
+    pixels = bytearray(count * 4)
+    pixels[0::4] = brightness
+    pixels[1::4] = bytes(map(operator.getitem, tables, values[0::3]))
+    pixels[2::4] = bytes(map(operator.getitem, tables, values[1::3]))
+    pixels[3::4] = bytes(map(operator.getitem, tables, values[2::3]))
+    return strip.set_pixels(pixels, "brgb", start)
+
+
+def _set_pixels_hdr_numpy(strip, buffer, start, levels, scales):
+    """
+    NumPy version of set_pixels_hdr.
+    """
+    import numpy
+    values = numpy.asarray(buffer, dtype=numpy.uint16).reshape((-1, 3))
+    count = len(values)
+    if start < 0 or start + count > strip.num_pixels:
+        raise ValueError("Pixel value out of range")
+    if not count:
+        return 0
+    brightness = numpy.frombuffer(levels, dtype=numpy.uint8)[values.max(axis=1) >> 8]
+    scale = numpy.array(scales, dtype=numpy.uint32)[brightness]
+    pixels = numpy.empty((count, 4), dtype=numpy.uint8)
+    pixels[:, 0] = brightness
+    pixels[:, 1:] = ((values * scale[:, None]) + 0x8000) >> 16
+    return strip.set_pixels(pixels, "brgb", start)
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+#
+# Timing statistics for APA102/DotStar strips/strings
+# Copyright © 2018  Dave Hocker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# See the LICENSE.md file for more details.
+#
+# While enabled, the setter, fill and show methods of one DotStarAPA102
+# instance are shadowed by timed versions stored in the instance dictionary.
+# Disabling removes them again, so a strip that is not instrumented runs the
+# plain class methods at no cost.
+#
+
+import time
+
+# Methods replaced by timed versions when instrumentation is enabled
+_INSTRUMENTED_METHODS = ("set_pixel_color", "set_pixel_rgb", "set_pixel_brgb", "set_pixels",
+                         "set_pixels_at", "restamp_brightness", "fill_rgb", "fill_brgb",
+                         "rotate", "shift", "clear", "show_async", "show_body")
+
+
+def _timed(calls, name, method):
+    """
+    Wrap a bound method so that its call count and cumulative time are
+    accumulated in calls[name].
+
+    :param calls: Dictionary of name: (count, cumulative time).
+    :param name: Method name.
+    :param method: Bound method to be wrapped.
+    :return: Wrapper function.
+    """
+    calls.setdefault(name, (0, 0.0))
+
+    def wrapper(*args, **kwargs):
+        start = time.monotonic()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            count, total = calls[name]
+            calls[name] = (count + 1, total + time.monotonic() - start)
+    return wrapper
+
+
+class Instrumentation:
+    """
+    Timing statistics of a DotStarAPA102 instance: call counts and times of
+    the setter, fill and show methods, transmits, bytes sent, SPIDevice lock
+    wait time and the frame rate. Nested calls (e.g. set_pixel_rgb called by
+    set_pixel_color) are counted individually.
+    """
+    def __init__(self, strip):
+        """
+        Create an instance of Instrumentation. Nothing is recorded until enable is called.
+
+        :param strip: The DotStarAPA102 instance.
+        """
+        self.strip = strip
+        self._stats = None
+
+    def enable(self):
+        """
+        Start recording timing statistics, discarding those recorded so far.
+        The instrumented methods are replaced by timed versions on the strip
+        instance only.
+
+        :return: None.
+        """
+        self.disable()
+        self._stats = {
+            "calls": {},
+            "shows": 0,
+            "show_time": 0.0,
+            "transmits": 0,
+            "bytes_sent": 0,
+            "lock_wait_time": 0.0,
+            "first_transmit": None,
+            "last_transmit": None,
+        }
+        strip = self.strip
+        for name in _INSTRUMENTED_METHODS:
+            setattr(strip, name, _timed(self._stats["calls"], name, getattr(strip, name)))
+        strip.show = self._show
+        strip._transmit = self._transmit
+
+    def disable(self):
+        """
+        Stop recording timing statistics and restore the uninstrumented methods.
+        The statistics recorded so far remain available through stats().
+
+        :return: None.
+        """
+        for name in _INSTRUMENTED_METHODS + ("show", "_transmit"):
+            self.strip.__dict__.pop(name, None)
+
+    def stats(self):
+        """
+        Returns a snapshot of the statistics recorded while instrumentation was enabled.
+        Times are in seconds.
+
+        * calls (dictionary of method name: (call count, cumulative time))
+        * shows (number of show() calls) and show_time (cumulative show() wall time)
+        * transmits and bytes_sent (frames written to the SPI device and their size)
+        * lock_wait_time (cumulative time spent acquiring the SPIDevice lock)
+        * fps (frames transmitted per second between the first and last transmit,
+          by show, show_async or show_body)
+        * frames_sent and frames_skipped (see the DotStarAPA102 properties of the same name)
+
+        :return: Dictionary of statistics, or None if instrumentation was never enabled.
+        """
+        if self._stats is None:
+            return None
+        snapshot = dict(self._stats)
+        snapshot["calls"] = dict(self._stats["calls"])
+        first = snapshot.pop("first_transmit")
+        last = snapshot.pop("last_transmit")
+        snapshot["fps"] = 0.0
+        if snapshot["transmits"] > 1 and last > first:
+            snapshot["fps"] = (snapshot["transmits"] - 1) / (last - first)
+        snapshot["frames_sent"] = self.strip.frames_sent
+        snapshot["frames_skipped"] = self.strip.frames_skipped
+        return snapshot
+
+    def _show(self, partial=False, force=False):
+        """
+        Timed version of show, installed by enable.
+        """
+        stats = self._stats
+        start = time.monotonic()
+        result = type(self.strip).show(self.strip, partial=partial, force=force)
+        end = time.monotonic()
+        stats["shows"] += 1
+        stats["show_time"] += end - start
+        return result
+
+    def _transmit(self, *buffers):
+        """
+        Timed version of the strip's _transmit, installed by enable.
+        """
+        stats = self._stats
+        strip = self.strip
+        start = time.monotonic()
+        if stats["first_transmit"] is None:
+            stats["first_transmit"] = start
+        stats["last_transmit"] = start
+        with strip.spi as spi:
+            stats["lock_wait_time"] += time.monotonic() - start
+            for buf in buffers:
+                stats["bytes_sent"] += len(buf)
+                strip._write(spi, buf)
+        stats["transmits"] += 1
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+#
+# 2D matrix layouts for DotStarAPA102 strings
+# Copyright © 2018  Dave Hocker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# See the LICENSE.md file for more details.
+#
+
+import operator
+
+# Rows whose runs average fewer pixels than this are blitted by gathering the
+# pixels of each string from the image instead of writing the runs
+_MIN_RUN_LENGTH = 4
+
+# Cache of panel index tables keyed by (width, height, serpentine, rotation)
+_panel_cache = {}
+
+
+def _panel_table(width, height, serpentine, rotation):
+    """
+    Returns the index table of a single panel, building and caching it on first use.
+    The panel is wired row by row starting at the top left corner. Odd rows run
+    right to left when serpentine. The panel is then rotated clockwise.
+
+    :param width: Panel width in pixels, as wired.
+    :param height: Panel height in pixels, as wired.
+    :param serpentine: True if alternate rows are wired in reverse.
+    :param rotation: Clockwise rotation, 0, 90, 180 or 270.
+    :return: (table width, table height, table). The table is a row-major tuple
+        of pixel indexes.
+    """
+    key = (width, height, serpentine, rotation)
+    cached = _panel_cache.get(key)
+    if cached is not None:
+        return cached
+    if rotation not in (0, 90, 180, 270):
+        raise ValueError("rotation must be 0, 90, 180 or 270")
+    if rotation in (0, 180):
+        table_width, table_height = width, height
+    else:
+        table_width, table_height = height, width
+    table = [None] * (width * height)
+    for pixel in range(width * height):
+        row, col = divmod(pixel, width)
+        if serpentine and row & 1:
+            col = width - 1 - col
+        if rotation == 0:
+            x, y = col, row
+        elif rotation == 90:
+            x, y = height - 1 - row, col
+        elif rotation == 180:
+            x, y = width - 1 - col, height - 1 - row
+        else:
+            x, y = row, width - 1 - col
+        table[(y * table_width) + x] = pixel
+    cached = (table_width, table_height, tuple(table))
+    _panel_cache[key] = cached
+    return cached
+
+
+class PixelLayout:
+    """
+    Maps a width x height canvas of (x, y) positions onto the pixels of one or
+    more DotStarAPA102 strings. The complete mapping is computed once, when the
+    layout is created. Each canvas row is compressed into runs of pixels on one
+    string with a constant index step (e.g. a serpentine row is a single run with
+    step -1), so blit writes a whole run with a single bulk set_pixels call.
+    When the runs are short (e.g. a serpentine panel rotated by 90 degrees) blit
+    instead gathers the pixels of each string from the image with a precomputed
+    table and writes them with one bulk call per string.
+
+    Use MatrixLayout for a single panel or TiledLayout to combine panels.
+    """
+    def __init__(self, width, height, strips, table):
+        """
+        Initialize an instance of PixelLayout
+
+        :param width: Canvas width.
+        :param height: Canvas height.
+        :param strips: List of the DotStarAPA102 instances used by the layout.
+        :param table: Row-major sequence with a (strip number, pixel index) tuple for each
+            canvas position, or None for positions without a pixel.
+        """
+        if len(table) != width * height:
+            raise ValueError("Layout table must have width * height entries")
+        self.width = width
+        self.height = height
+        self.strips = strips
+        self.table = tuple(table)
+        self.runs = [self._row_runs(y) for y in range(height)]
+        # blit plans keyed by (x, y, width, height)
+        self._plans = {}
+
+    def _row_runs(self, y):
+        """
+        Compress a canvas row into runs.
+
+        :param y: Canvas row.
+        :return: List of (x, count, strip number, first pixel, step) tuples.
+        """
+        runs = []
+        row = self.table[y * self.width:(y + 1) * self.width]
+        x = 0
+        while x < self.width:
+            if row[x] is None:
+                x += 1
+                continue
+            strip_no, first = row[x]
+            count = 1
+            step = 1
+            if x + 1 < self.width and row[x + 1] is not None and row[x + 1][0] == strip_no \
+                    and row[x + 1][1] != first:
+                step = row[x + 1][1] - first
+                while x + count < self.width and \
+                        row[x + count] == (strip_no, first + (count * step)):
+                    count += 1
+            runs.append((x, count, strip_no, first, step))
+            x += count
+        return runs
+
+    def pixel(self, x, y):
+        """
+        Returns the string and pixel index at a canvas position.
+
+        :param x: Canvas column, 0 to width - 1.
+        :param y: Canvas row, 0 to height - 1.
+        :return: (DotStarAPA102 instance, pixel index) or None if there is no pixel there.
+        """
+        if x < 0 or x >= self.width or y < 0 or y >= self.height:
+            raise ValueError("Position out of range")
+        entry = self.table[(y * self.width) + x]
+        if entry is None:
+            return None
+        return self.strips[entry[0]], entry[1]
+
+    def set_pixel_rgb(self, x, y, r, g, b):
+        """
+        Set the color of the pixel at a canvas position.
+
+        :param x: Canvas column, 0 to width - 1.
+        :param y: Canvas row, 0 to height - 1.
+        :param r: Red value, 0-255.
+        :param g: Green value, 0-255.
+        :param b: Blue value, 0-255.
+        :return: None.
+        """
+        entry = self.pixel(x, y)
+        if entry is not None:
+            entry[0].set_pixel_rgb(entry[1], r, g, b)
+
+    def blit(self, image, x=0, y=0, width=None):
+        """
+        Copy a row-major RGB image (3 bytes per pixel) onto the canvas.
+        The part of the image outside of the canvas is ignored.
+
+        :param image: Any buffer-protocol object holding the image.
+        :param x: Canvas column of the left edge of the image.
+        :param y: Canvas row of the top edge of the image.
+        :param width: Image width in pixels. None means the canvas width.
+        :return: None.
+        """
+        if width is None:
+            width = self.width
+        data = memoryview(image).cast("B")
+        if len(data) % (width * 3):
+            raise ValueError("Image size must be a multiple of width * 3 bytes")
+        height = len(data) // (width * 3)
+        key = (x, y, width, height)
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = self._plan(x, y, width, height)
+            self._plans[key] = plan
+        strips = self.strips
+        runs, gathers = plan
+        for strip_no, offset, count, first, step in runs:
+            strips[strip_no].set_pixels(data[offset:offset + (count * 3)], "rgb", first, step)
+        if gathers:
+            data = bytes(data)
+            for strip_no, gather, first, indices in gathers:
+                if indices is None:
+                    strips[strip_no].set_pixels(bytes(gather(data)), "rgb", first)
+                else:
+                    strips[strip_no].set_pixels_at(indices, bytes(gather(data)))
+
+    def _plan(self, x, y, width, height):
+        """
+        Work out the bulk writes for blitting an image of a given size and position.
+
+        :return: (runs, gathers). runs is a list of (strip number, image byte offset,
+            count, first pixel, step) tuples. gathers is a list of (strip number,
+            function returning the RGB bytes of the string's pixels from the image,
+            first pixel, pixel indexes) tuples. The pixel indexes are None if the
+            pixels are consecutive from first pixel.
+        """
+        runs = self._plan_runs(x, y, width, height)
+        pixels = sum(run[2] for run in runs)
+        if len(runs) * _MIN_RUN_LENGTH <= pixels:
+            return runs, []
+        # Image byte offset of each pixel, by string
+        offsets = {}
+        for strip_no, offset, count, first, step in runs:
+            targets = offsets.setdefault(strip_no, {})
+            for n in range(count):
+                targets[first + (n * step)] = offset + (n * 3)
+        gathers = []
+        for strip_no, targets in sorted(offsets.items()):
+            indices = sorted(targets)
+            gather = operator.itemgetter(*[targets[pixel] + c for pixel in indices
+                                           for c in range(3)])
+            if indices[-1] - indices[0] + 1 == len(indices):
+                gathers.append((strip_no, gather, indices[0], None))
+            else:
+                gathers.append((strip_no, gather, indices[0], tuple(indices)))
+        return [], gathers
+
+    def _plan_runs(self, x, y, width, height):
+        """
+        Clip the row runs to an image of a given size and position.
+
+        :return: List of (strip number, image byte offset, count, first pixel, step) tuples.
+        """
+        plan = []
+        for image_y in range(max(0, -y), min(height, self.height - y)):
+            for run_x, count, strip_no, first, step in self.runs[y + image_y]:
+                # Clip the run to the columns covered by the image
+                start = max(run_x, x)
+                end = min(run_x + count, x + width)
+                if start >= end:
+                    continue
+                offset = ((image_y * width) + (start - x)) * 3
+                plan.append((strip_no, offset, end - start, first + ((start - run_x) * step), step))
+        return plan
+
+
+class MatrixLayout(PixelLayout):
+    """
+    A single rectangular panel of pixels on one DotStarAPA102 string.
+    The panel is wired row by row from the top left corner, with alternate
+    rows reversed when serpentine. Use rotation for panels mounted
+    rotated (or wired by column).
+    """
+    def __init__(self, strip, width, height, serpentine=True, rotation=0, offset=0):
+        """
+        Initialize an instance of MatrixLayout
+
+        :param strip: The DotStarAPA102 instance driving the panel.
+        :param width: Panel width in pixels, as wired.
+        :param height: Panel height in pixels, as wired.
+        :param serpentine: True if alternate rows are wired in reverse.
+        :param rotation: Clockwise rotation of the panel, 0, 90, 180 or 270.
+        :param offset: Index of the first panel pixel on the string.
+        """
+        if offset < 0 or offset + (width * height) > strip.num_pixels:
+            raise ValueError("Panel does not fit on the string")
+        table_width, table_height, table = _panel_table(width, height, serpentine, rotation)
+        super().__init__(table_width, table_height, [strip],
+                         [(0, offset + pixel) for pixel in table])
+
+
+class TiledLayout(PixelLayout):
+    """
+    A canvas made of several layouts (usually MatrixLayout panels), each
+    placed at a given position. Panels can be on different strings or share one.
+    """
+    def __init__(self, width, height, tiles):
+        """
+        Initialize an instance of TiledLayout
+
+        :param width: Canvas width.
+        :param height: Canvas height.
+        :param tiles: Sequence of (layout, x, y) tuples placing each layout on the canvas.
+        """
+        strips = []
+        table = [None] * (width * height)
+        for tile, tile_x, tile_y in tiles:
+            if tile_x < 0 or tile_y < 0 or tile_x + tile.width > width or \
+                    tile_y + tile.height > height:
+                raise ValueError("Tile does not fit on the canvas")
+            numbers = []
+            for strip in tile.strips:
+                if strip not in strips:
+                    strips.append(strip)
+                numbers.append(strips.index(strip))
+            for row in range(tile.height):
+                for col in range(tile.width):
+                    entry = tile.table[(row * tile.width) + col]
+                    if entry is not None:
+                        table[((tile_y + row) * width) + tile_x + col] = \
+                            (numbers[entry[0]], entry[1])
+        super().__init__(width, height, strips, table)
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+#
+# Concurrent transmit for multiple DotStarAPA102 strings
+# Copyright © 2018  Dave Hocker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# See the LICENSE.md file for more details.
+#
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class MultiStripController:
+    """
+    Owns several DotStarAPA102 instances and transmits them concurrently.
+
+    Strings are grouped by the SPI bus their SPIDevice uses. Each group is
+    transmitted by one worker thread, one string after another, so strings that
+    share a bus (e.g. on different chip selects) never contend for the bus lock.
+    Groups on different buses are transmitted in parallel.
+    **Requires threading support (CPython).**
+    """
+    def __init__(self, strips, max_workers=None):
+        """
+        Initialize an instance of MultiStripController
+
+        :param strips: Sequence of DotStarAPA102 instances.
+        :param max_workers: Maximum number of transmit threads. None means one per bus.
+        """
+        self.strips = list(strips)
+        groups = {}
+        for index, strip in enumerate(self.strips):
+            groups.setdefault(id(strip.spi.spi), []).append(index)
+        self.groups = list(groups.values())
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or len(self.groups))
+        self.timings = None
+        self.latched_at = None
+
+    def __len__(self):
+        return len(self.strips)
+
+    def __getitem__(self, index):
+        return self.strips[index]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def show_all(self, partial=False, force=False):
+        """
+        Transmit all strings, with strings on different buses in parallel.
+        Returns when every string has been transmitted (all strings latched).
+
+        :param partial: Passed to each show(). If True only changed prefixes are sent.
+        :param force: Passed to each show(). If True unchanged strings are sent as well.
+        :return: List of per string timings, in strip order. Each entry is a
+            (start, end) tuple of time.monotonic() values.
+        """
+        timings = [None] * len(self.strips)
+        futures = [self._executor.submit(self._show_group, group, timings, partial, force)
+                   for group in self.groups]
+        # Wait for every group. result() re-raises any transmit error.
+        for future in futures:
+            future.result()
+        self.latched_at = time.monotonic()
+        self.timings = timings
+        return timings
+
+    def _show_group(self, group, timings, partial, force):
+        """
+        Transmit the strings of a group one after another.
+
+        :param group: List of strip indexes that share a bus.
+        :param timings: List receiving the (start, end) time of each string.
+        :param partial: Passed to show().
+        :param force: Passed to show().
+        :return: None.
+        """
+        for index in group:
+            start = time.monotonic()
+            self.strips[index].show(partial=partial, force=force)
+            timings[index] = (start, time.monotonic())
+
+    def clear_all(self, show=True):
+        """
+        Set all pixels of all strings to off.
+
+        :param show: If True, transmit the cleared strings.
+        :return: True if successful.
+        """
+        for strip in self.strips:
+            strip.clear(show=False)
+        if show:
+            self.show_all()
+        return True
+
+    def close(self):
+        """
+        Stop the transmit threads.
+
+        :return: None.
+        """
+        self._executor.shutdown(wait=True)
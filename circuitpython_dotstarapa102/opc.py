@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+#
+# Open Pixel Control server for DotStarAPA102
+# Copyright © 2018  Dave Hocker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# See the LICENSE.md file for more details.
+#
+# Open Pixel Control (http://openpixelcontrol.org/) messages are
+# channel (u8), command (u8), data length (u16, big endian), data.
+# Command 0 sets pixel colors, 3 bytes (r, g, b) per pixel. Channel 0
+# addresses every string, channel n addresses string n.
+#
+
+import asyncio
+import sys
+
+OPC_PORT = 7890
+_SET_PIXELS = 0
+_HEADER_SIZE = 4
+_MAX_MESSAGE = _HEADER_SIZE + 0xFFFF
+
+# asyncio.BufferedProtocol is new in Python 3.7. The module still imports on
+# older versions (e.g. for the documentation build), OPCServer checks the version.
+_BufferedProtocol = getattr(asyncio, "BufferedProtocol", asyncio.Protocol)
+
+
+class OPCServer:
+    """
+    An asyncio based Open Pixel Control server feeding one or more
+    DotStarAPA102 instances. Pixel data goes straight from the receive
+    buffer into the strings with set_pixels.
+
+    Each received frame starts a show_async transmit of the string. Frames
+    that arrive while the string is still transmitting are coalesced: the
+    pixels are updated and only the latest frame is sent when the transmit
+    completes. **Requires Python 3.7 or later.**
+    """
+    def __init__(self, strips, partial=False):
+        """
+        Initialize an instance of OPCServer
+
+        :param strips: A DotStarAPA102 instance, or a sequence of them for channels 1 to n.
+        :param partial: Passed to show_async. If True only the changed prefix is sent.
+        """
+        if sys.version_info < (3, 7):
+            raise RuntimeError("OPCServer requires Python 3.7 or later")
+        if not isinstance(strips, (list, tuple)):
+            strips = [strips]
+        self.strips = list(strips)
+        self.partial = partial
+        self.messages = 0
+        self.frames_coalesced = 0
+        self._in_flight = [False] * len(self.strips)
+        self._pending = [False] * len(self.strips)
+        self._servers = []
+        self._transports = []
+
+    async def start(self, host="0.0.0.0", port=OPC_PORT, udp_port=None):
+        """
+        Start listening.
+
+        :param host: Address to listen on.
+        :param port: TCP port, None for no TCP listener.
+        :param udp_port: UDP port, None for no UDP listener. Each datagram is one OPC message.
+        :return: None.
+        """
+        loop = asyncio.get_running_loop()
+        if port is not None:
+            self._servers.append(
+                await loop.create_server(lambda: _OPCStreamProtocol(self), host, port))
+        if udp_port is not None:
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda: _OPCDatagramProtocol(self), local_addr=(host, udp_port))
+            self._transports.append(transport)
+
+    @property
+    def sockets(self):
+        """
+        Returns the listening sockets (e.g. to find the port when started with port 0).
+        """
+        sockets = []
+        for server in self._servers:
+            sockets.extend(server.sockets)
+        for transport in self._transports:
+            sockets.append(transport.get_extra_info("socket"))
+        return sockets
+
+    async def close(self):
+        """
+        Stop listening.
+
+        :return: None.
+        """
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        for transport in self._transports:
+            transport.close()
+        self._servers = []
+        self._transports = []
+
+    def message(self, channel, command, data):
+        """
+        Handle a received OPC message.
+
+        :param channel: OPC channel.
+        :param command: OPC command.
+        :param data: Message data (a memoryview into the receive buffer).
+        :return: None.
+        """
+        self.messages += 1
+        if command != _SET_PIXELS:
+            return
+        if channel == 0:
+            numbers = range(len(self.strips))
+        elif channel <= len(self.strips):
+            numbers = (channel - 1,)
+        else:
+            return
+        for number in numbers:
+            strip = self.strips[number]
+            # Extra pixels or a trailing partial pixel are ignored
+            length = min(len(data) - (len(data) % 3), strip.num_pixels * 3)
+            if length:
+                strip.set_pixels(data[:length], "rgb")
+                self._show(number)
+
+    def _show(self, number):
+        """
+        Transmit a string, or mark it pending if it is already transmitting.
+
+        :param number: Index of the string.
+        :return: None.
+        """
+        if self._in_flight[number]:
+            if self._pending[number]:
+                self.frames_coalesced += 1
+            self._pending[number] = True
+            return
+        self._in_flight[number] = True
+        future = asyncio.wrap_future(self.strips[number].show_async(partial=self.partial))
+        future.add_done_callback(lambda _: self._shown(number))
+
+    def _shown(self, number):
+        """
+        Called on the event loop when a transmit completes.
+
+        :param number: Index of the string.
+        :return: None.
+        """
+        self._in_flight[number] = False
+        if self._pending[number]:
+            self._pending[number] = False
+            self._show(number)
+
+
+class _OPCStreamProtocol(_BufferedProtocol):
+    """
+    TCP connection. Data is received directly into a preallocated buffer
+    large enough for the largest OPC message.
+    """
+    def __init__(self, server):
+        self.server = server
+        self.buffer = bytearray(_MAX_MESSAGE)
+        self.view = memoryview(self.buffer)
+        self.used = 0
+
+    def get_buffer(self, sizehint):
+        return self.view[self.used:]
+
+    def buffer_updated(self, nbytes):
+        self.used += nbytes
+        view = self.view
+        x = 0
+        while self.used - x >= _HEADER_SIZE:
+            length = (view[x + 2] << 8) | view[x + 3]
+            end = x + _HEADER_SIZE + length
+            if end > self.used:
+                break
+            self.server.message(view[x], view[x + 1], view[x + _HEADER_SIZE:end])
+            x = end
+        if x:
+            # Move the start of an incomplete message to the front. The ranges may
+            # overlap, memoryview assignment copies them safely.
+            view[:self.used - x] = view[x:self.used]
+            self.used -= x
+
+
+class _OPCDatagramProtocol(asyncio.DatagramProtocol):
+    """
+    UDP listener. Each datagram holds one OPC message.
+    """
+    def __init__(self, server):
+        self.server = server
+
+    def datagram_received(self, data, addr):
+        view = memoryview(data)
+        if len(view) >= _HEADER_SIZE:
+            length = (view[2] << 8) | view[3]
+            self.server.message(view[0], view[1], view[_HEADER_SIZE:_HEADER_SIZE + length])
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+#
+# Palette mode for APA102/DotStar strips/strings
+# Copyright © 2018  Dave Hocker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# See the LICENSE.md file for more details.
+#
+# The palette is kept as four translate tables, one per byte of a "brgb"
+# pixel (brightness 0-31, red, green, blue). The pixels are built by
+# translating the index bytes with each table and written with one
+# set_pixels call.
+#
+
+
+class Palette:
+    """
+    Palette mode for a DotStarAPA102 instance. Each pixel holds an index (0-255)
+    into a palette of 256 colors, and the LED frames are built from the indexes
+    and the palette in one bulk operation before each show (a pre_show callback
+    of the strip). Changing the palette changes every pixel that uses it, so
+    color cycling costs at most 256 entries per frame instead of every pixel.
+    Entries not yet set are off. All pixels start at index 0.
+
+    Pixels are rebuilt only when their indexes or the palette change. Pixels set
+    with the DotStarAPA102 methods are overwritten when that happens.
+    """
+    def __init__(self, strip, colors=None, brightness=None):
+        """
+        Create an instance of Palette and switch the strip to palette mode.
+
+        :param strip: The DotStarAPA102 instance.
+        :param colors: Sequence of 0xRRGGBB or (r, g, b) colors for the first entries,
+            or None.
+        :param brightness: Brightness value 0-31 for these entries. None means global
+            brightness.
+        """
+        self.strip = strip
+        # Palette index of each pixel. Call mark_dirty() after writing directly.
+        self.indexes = bytearray(strip.num_pixels)
+        self._tables = [bytearray(256) for _ in range(4)]
+        # High-water mark of the pixels to be rebuilt before the next show
+        self._dirty = strip.num_pixels
+        if colors is not None:
+            self.set_colors(colors, brightness)
+        strip.add_show_callbacks(pre_show=self._expand)
+
+    def set_colors(self, colors, brightness=None, start=0):
+        """
+        Set palette entries.
+
+        :param colors: Sequence of 0xRRGGBB or (r, g, b) colors for entries start onwards.
+        :param brightness: Brightness value 0-31 for these entries. None means global brightness.
+        :param start: First palette entry to be set, 0-255.
+        :return: None.
+        """
+        if start < 0 or start + len(colors) > 256:
+            raise ValueError("Palette entries must be in the range 0-255")
+        if brightness is None:
+            brightness = self.strip.global_brightness
+        if brightness < 0 or brightness > 31:
+            raise ValueError("Brightness must be in the range 0-31")
+        colors = [((c >> 16) & 0xFF, (c >> 8) & 0xFF, c & 0xFF) if isinstance(c, int) else c
+                  for c in colors]
+        end = start + len(colors)
+        levels, reds, greens, blues = self._tables
+        levels[start:end] = bytes((brightness,)) * len(colors)
+        reds[start:end] = bytes(c[0] for c in colors)
+        greens[start:end] = bytes(c[1] for c in colors)
+        blues[start:end] = bytes(c[2] for c in colors)
+        self.mark_dirty()
+
+    def rotate(self, n, start=0, end=256):
+        """
+        Rotate a range of palette entries by n positions (color cycling).
+        Entries moved beyond the end of the range reappear at its start.
+
+        :param n: Number of positions. Positive values move entries towards higher indexes.
+        :param start: First palette entry of the range, 0-255.
+        :param end: One past the last palette entry of the range, 1-256.
+        :return: None.
+        """
+        if start < 0 or end > 256:
+            raise ValueError("Palette entries must be in the range 0-255")
+        if end - start < 2:
+            return
+        split = end - (n % (end - start))
+        for table in self._tables:
+            table[start:end] = table[split:end] + table[start:split]
+        self.mark_dirty()
+
+    def set_pixel_index(self, pixel, index):
+        """
+        Set the palette index of a given pixel.
+
+        :param pixel: Pixel to be set, 0 to num_pixels - 1.
+        :param index: Palette entry, 0-255.
+        :return: None.
+        """
+        if pixel >= len(self.indexes):
+            raise ValueError("Pixel value out of range")
+        self.indexes[pixel] = index
+        if pixel >= self._dirty:
+            self._dirty = pixel + 1
+
+    def set_pixel_indexes(self, buffer, start=0):
+        """
+        Set the palette indexes of a run of pixels from a buffer of bytes,
+        one index per pixel.
+
+        :param buffer: Bytes-like object of palette indexes.
+        :param start: Pixel index of the first pixel to be set, 0 to num_pixels - 1.
+        :return: Number of pixels set.
+        """
+        data = memoryview(buffer).cast("B")
+        if start < 0 or start + len(data) > len(self.indexes):
+            raise ValueError("Pixel value out of range")
+        self.indexes[start:start + len(data)] = data
+        self.mark_dirty(start + len(data))
+        return len(data)
+
+    def mark_dirty(self, end=None):
+        """
+        Rebuild pixels before the next show, e.g. after writing into indexes directly.
+
+        :param end: One past the last pixel changed. None means all pixels.
+        :return: None.
+        """
+        if end is None or end > len(self.indexes):
+            end = len(self.indexes)
+        if end > self._dirty:
+            self._dirty = end
+
+    def close(self):
+        """
+        Leave palette mode. The strip keeps the pixels built last.
+
+        :return: None.
+        """
+        self.strip.remove_show_callbacks(pre_show=self._expand)
+
+    def _expand(self, strip):
+        """
+        Build the LED frames of the changed pixels from their palette indexes.
+        Each byte of a pixel is one translate of the indexes.
+
+        :param strip: The DotStarAPA102 instance.
+        :return: None.
+        """
+        count = self._dirty
+        if not count:
+            return
+        indexes = self.indexes[:count]
+        pixels = bytearray(count * 4)
+        for x, table in enumerate(self._tables):
+            pixels[x::4] = indexes.translate(table)
+        strip.set_pixels(pixels, "brgb")
+        self._dirty = 0
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+#
+# Current estimate and power limit for APA102/DotStar strips/strings
+# Copyright © 2018  Dave Hocker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# See the LICENSE.md file for more details.
+#
+# Power estimates are kept in units of brightness (0-31) * value (0-255) * uA at
+# full duty, so the running total is an exact integer.
+#
+
+import operator
+
+# Translate table mapping an LED frame header byte to its 5 bit brightness
+_HEADER_BRIGHTNESS = bytes(v & 0x1F for v in range(256))
+
+UNITS_PER_MA = 31 * 255 * 1000
+
+# Cache of scale tables keyed by level (0-255, in 1/256 steps)
+_scale_cache = {}
+
+
+def scale_table(level):
+    """
+    Returns the translate table scaling a color value by level / 256, rounded down.
+
+    :param level: Scale factor in 1/256 steps, 0-255.
+    :return: 256 byte table.
+    """
+    table = _scale_cache.get(level)
+    if table is None:
+        table = bytes((v * level) >> 8 for v in range(256))
+        _scale_cache[level] = table
+    return table
+
+
+class PowerLimit:
+    """
+    Current budget of a string, see DotStarAPA102.set_power_limit. Holds the
+    running power estimate of the pixels, which the DotStarAPA102 pixel writers
+    keep up to date, and the scale factor of the last frame transmitted.
+    Pixels are estimated at the colors they are transmitted with, after color
+    correction.
+    """
+    def __init__(self, offsets, num_px, max_ma, ma_per_channel, idle_ma, correction=None):
+        """
+        Create an instance of PowerLimit.
+
+        :param offsets: (brightness, red, green, blue) offsets within an LED frame.
+        :param num_px: Number of pixels in the string.
+        :param max_ma: Current budget in mA for the whole string.
+        :param ma_per_channel: (r, g, b) current in mA of a channel at full value and brightness.
+        :param idle_ma: Current in mA drawn by each pixel when it is off.
+        :param correction: (r, g, b) color correction translate tables, or None.
+        """
+        if len(ma_per_channel) != 3:
+            raise ValueError("ma_per_channel must have one value per color")
+        self.offsets = offsets
+        self.weights = tuple(int(round(ma * 1000.0)) for ma in ma_per_channel)
+        self.max_ma = max_ma
+        self.idle_ma = idle_ma * num_px
+        self.correction = correction
+        # Power units of the stored pixels. None until counted and after direct
+        # writes into px.
+        self.total = None
+        # Scale factor of the last frame transmitted, in 1/256 steps
+        self.level = 256
+
+    def set_correction(self, correction):
+        """
+        Change the color correction the pixels are estimated with.
+        The running estimate is recounted when next needed.
+
+        :param correction: (r, g, b) color correction translate tables, or None.
+        :return: None.
+        """
+        self.correction = correction
+        self.total = None
+
+    def units(self, frames, first=0, stop=None, step=4, corrected=True):
+        """
+        Returns the power estimate of a run of LED frames.
+
+        :param frames: Buffer of LED frames.
+        :param first: Offset of the first LED frame.
+        :param stop: Offset one beyond the last LED frame (in the direction of step).
+            None means the end of frames.
+        :param step: Offset increment between LED frames.
+        :param corrected: If False, the LED frames are transmitted without color correction.
+        :return: Integer power units.
+        """
+        frames = memoryview(frames).cast("B")
+        if stop is None:
+            stop = len(frames)
+        bx, rx, gx, bluex = self.offsets
+        red_ua, green_ua, blue_ua = self.weights
+        levels = bytes(frames[first + bx:stop + bx:step]).translate(_HEADER_BRIGHTNESS)
+        reds = frames[first + rx:stop + rx:step]
+        greens = frames[first + gx:stop + gx:step]
+        blues = frames[first + bluex:stop + bluex:step]
+        if corrected and self.correction is not None:
+            red, green, blue = self.correction
+            reds = bytes(reds).translate(red)
+            greens = bytes(greens).translate(green)
+            blues = bytes(blues).translate(blue)
+        if levels and levels.count(levels[0]) == len(levels):
+            # All pixels at the same brightness (e.g. global brightness)
+            return levels[0] * ((red_ua * sum(reds)) + (green_ua * sum(greens)) +
+                                (blue_ua * sum(blues)))
+        return (red_ua * sum(map(operator.mul, levels, reds))) + \
+            (green_ua * sum(map(operator.mul, levels, greens))) + \
+            (blue_ua * sum(map(operator.mul, levels, blues)))
+
+    def pixel_units(self, brightness, r, g, b):
+        """
+        Returns the power estimate of a single pixel.
+
+        :param brightness: Brightness value, 0-31 (or an LED frame header byte).
+        :param r: Red value, 0-255.
+        :param g: Green value, 0-255.
+        :param b: Blue value, 0-255.
+        :return: Integer power units.
+        """
+        if self.correction is not None:
+            red, green, blue = self.correction
+            r, g, b = red[r], green[g], blue[b]
+        red_ua, green_ua, blue_ua = self.weights
+        return (brightness & 0x1F) * ((r * red_ua) + (g * green_ua) + (b * blue_ua))
+
+    def ma(self, units):
+        """
+        Returns the current in mA of a frame, including the idle current.
+
+        :param units: Power estimate of all pixels of the frame.
+        :return: Current in mA.
+        """
+        return (units / float(UNITS_PER_MA)) + self.idle_ma
+
+    def limit_level(self, units):
+        """
+        Compare the power estimate of a frame with the budget.
+
+        :param units: Power estimate of all pixels of the frame.
+        :return: Scale factor in 1/256 steps needed to stay within the budget, 256 for none.
+        """
+        budget = (self.max_ma - self.idle_ma) * UNITS_PER_MA
+        if units <= max(budget, 0):
+            return 256
+        return max(0, int((budget * 256) // units))
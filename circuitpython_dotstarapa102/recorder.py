@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+#
+# Frame recording and memory-mapped replay for DotStarAPA102
+# Copyright © 2018  Dave Hocker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# See the LICENSE.md file for more details.
+#
+# File format (all values little endian)
+#
+# Header: magic "DSAR", version (u16), flags (u16), num_px (u32),
+#   frame size in bytes (u32), color order (4 bytes, zero padded),
+#   creation time (f64, seconds since the epoch)
+# Records: time since the first frame (f64), kind (u32), payload length (u32), payload
+#   kind 0 (key frame): payload is the LED frames (num_px * 4 bytes) as sent,
+#   after color correction and the power limit
+#   kind 1 (delta frame): payload is a sequence of runs, each run is
+#   offset (u32), length (u32) and length bytes replacing the previous frame
+#
+
+import mmap
+import struct
+import time
+
+_MAGIC = b"DSAR"
+_VERSION = 1
+_FLAG_DELTA = 0x0001
+_HEADER = struct.Struct("<4sHHII4sd")
+_RECORD = struct.Struct("<dII")
+_RUN = struct.Struct("<II")
+KEY_FRAME = 0
+DELTA_FRAME = 1
+
+
+def _color_order(strip):
+    """
+    Returns the color order of a DotStarAPA102 instance as stored in the file header.
+
+    :param strip: The DotStarAPA102 instance.
+    :return: 4 bytes, e.g. b"bgr\0".
+    """
+    order = bytearray(4)
+    for color, index in (("r", strip.red_x), ("g", strip.green_x), ("b", strip.blue_x)):
+        order[index - 1] = ord(color)
+    return bytes(order)
+
+
+class FrameRecorder:
+    """
+    Records the LED frames of a DotStarAPA102 instance to a file each time
+    it transmits a frame (show, show_async). Frames are stored as sent, with
+    color correction and the power limit applied, and with their time
+    relative to the first recorded frame, for replay with FramePlayer.
+
+    With delta=True a frame is stored as the blocks that changed since the
+    previous frame, when that is smaller than the whole frame. A key frame is
+    stored at least every keyframe_interval frames.
+    """
+    def __init__(self, strip, path, delta=False, keyframe_interval=100, block_size=32):
+        """
+        Initialize an instance of FrameRecorder and start recording.
+
+        :param strip: The DotStarAPA102 instance to be recorded.
+        :param path: Path of the file to be written (overwritten if it exists).
+        :param delta: If True, use delta frames.
+        :param keyframe_interval: Maximum number of frames between key frames.
+        :param block_size: Granularity in bytes of delta frame runs.
+        """
+        self.strip = strip
+        self.delta = delta
+        self.keyframe_interval = keyframe_interval
+        self.block_size = block_size
+        self.frames = 0
+        self._start = None
+        self._previous = None
+        self._since_key = 0
+        self._file = open(path, "wb")
+        self._file.write(_HEADER.pack(_MAGIC, _VERSION, _FLAG_DELTA if delta else 0,
+                                      strip.num_pixels, strip.num_pixels * 4, _color_order(strip),
+                                      time.time()))
+        strip.add_show_callbacks(post_show=self.record)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def record(self, strip):
+        """
+        Record the current LED frames of the string. Called after each show.
+
+        :param strip: The DotStarAPA102 instance.
+        :return: None.
+        """
+        now = time.monotonic()
+        if self._start is None:
+            self._start = now
+        body = bytes(strip.transmitted_body)
+        payload = None
+        if self.delta and self._previous is not None and \
+                self._since_key < self.keyframe_interval:
+            payload = self._delta(self._previous, body)
+        if payload is None or len(payload) >= len(body):
+            self._file.write(_RECORD.pack(now - self._start, KEY_FRAME, len(body)))
+            self._file.write(body)
+            self._since_key = 0
+        else:
+            self._file.write(_RECORD.pack(now - self._start, DELTA_FRAME, len(payload)))
+            self._file.write(payload)
+            self._since_key += 1
+        self._previous = body
+        self.frames += 1
+
+    def _delta(self, previous, body):
+        """
+        Encode the blocks of body that differ from previous as runs.
+
+        :return: Delta payload.
+        """
+        size = self.block_size
+        previous = memoryview(previous)
+        current = memoryview(body)
+        runs = []
+        run_start = None
+        for x in range(0, len(body), size):
+            if previous[x:x + size] != current[x:x + size]:
+                if run_start is None:
+                    run_start = x
+            elif run_start is not None:
+                runs.append((run_start, x))
+                run_start = None
+        if run_start is not None:
+            runs.append((run_start, len(body)))
+        return b"".join(_RUN.pack(start, end - start) + body[start:end] for start, end in runs)
+
+    def close(self):
+        """
+        Stop recording and close the file.
+
+        :return: None.
+        """
+        if self._file is not None:
+            self.strip.remove_show_callbacks(post_show=self.record)
+            self._file.close()
+            self._file = None
+
+
+class FramePlayer:
+    """
+    Replays a file written by FrameRecorder on a DotStarAPA102 instance.
+
+    The file is memory-mapped and indexed once when it is opened. Key frames
+    are transmitted directly from the mapped file as memoryview slices, with
+    no parsing or copying per frame. Delta frames are applied to a working
+    copy of the previous frame, which is then transmitted.
+    **Requires mmap (CPython).**
+    """
+    def __init__(self, strip, path):
+        """
+        Initialize an instance of FramePlayer
+
+        :param strip: The DotStarAPA102 instance used for playback.
+        :param path: Path of a file written by FrameRecorder.
+        """
+        self.strip = strip
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        magic, version, self.flags, self.num_px, frame_size, order, self.created = \
+            _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC or version != _VERSION:
+            self.close()
+            raise ValueError("Not a DotStarAPA102 recording")
+        if self.num_px != strip.num_pixels or frame_size != self.num_px * 4:
+            self.close()
+            raise ValueError("Recording is for {0} pixels".format(self.num_px))
+        self.order = order.rstrip(b"\0").decode()
+        if order != _color_order(strip):
+            self.close()
+            raise ValueError("Recording is for color order {0}".format(self.order))
+        self.frame_size = frame_size
+        # Index of (time, kind, payload offset, payload length or list of delta runs)
+        self.index = []
+        offset = _HEADER.size
+        while offset + _RECORD.size <= len(self._map):
+            timestamp, kind, length = _RECORD.unpack_from(self._map, offset)
+            offset += _RECORD.size
+            if offset + length > len(self._map):
+                # Incomplete last frame, e.g. of an interrupted recording
+                break
+            if kind == DELTA_FRAME:
+                runs = []
+                x = offset
+                while x < offset + length:
+                    start, size = _RUN.unpack_from(self._map, x)
+                    runs.append((start, x + _RUN.size, size))
+                    x += _RUN.size + size
+                self.index.append((timestamp, kind, offset, runs))
+            else:
+                self.index.append((timestamp, kind, offset, length))
+            offset += length
+        self._work = bytearray(frame_size) if self.flags & _FLAG_DELTA else None
+
+    def __len__(self):
+        return len(self.index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def frame(self, number):
+        """
+        Returns the LED frames of a recorded frame, ready to be transmitted.
+        Frames must be taken in order when the recording contains delta frames.
+
+        :param number: Frame number, 0 to len(player) - 1.
+        :return: memoryview of num_pixels * 4 bytes.
+        """
+        _, kind, offset, payload = self.index[number]
+        view = self._view
+        if kind == KEY_FRAME:
+            body = view[offset:offset + payload]
+            if self._work is not None:
+                self._work[:] = body
+            return body
+        work = self._work
+        for start, data, size in payload:
+            work[start:start + size] = view[data:data + size]
+        return memoryview(work)
+
+    def play(self, speed=1.0, loop=False):
+        """
+        Play the recording, transmitting each frame at its recorded time.
+
+        :param speed: Playback speed multiplier. None plays the frames as fast as possible.
+        :param loop: If True, play the recording repeatedly (until interrupted).
+        :return: Number of frames transmitted.
+        """
+        strip = self.strip
+        sent = 0
+        while True:
+            start = time.monotonic()
+            for number in range(len(self.index)):
+                body = self.frame(number)
+                if speed:
+                    delay = start + (self.index[number][0] / speed) - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                strip.show_body(body)
+                sent += 1
+            if not loop or not self.index:
+                return sent
+
+    def close(self):
+        """
+        Close the recording.
+
+        :return: None.
+        """
+        if self._map is not None:
+            self._view.release()
+            self._map.close()
+            self._file.close()
+            self._map = None
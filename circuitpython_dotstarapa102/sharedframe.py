@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+#
+# Shared memory frame buffers for multi-process rendering
+# Copyright © 2018  Dave Hocker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# See the LICENSE.md file for more details.
+#
+# Shared memory layout
+#
+# Control block of signed 64 bit words: stopped, requested frame number of
+#   each slot, done frame number of each worker
+# Slots: one DotStarAPA102 transmit buffer (px) per slot, 8 byte aligned
+#
+# Frame f is rendered into slot f % slots by every worker w with
+# w % slots == f % slots. Workers write only after the frame is requested and
+# the controlling process transmits a slot only after all of its workers
+# reported the frame done, so a frame is never sent partly rendered.
+#
+# The control words of a slot (and of its workers) are only accessed with the
+# lock of the slot's multiprocessing.Condition held. Acquiring and releasing
+# the lock are memory barriers, so pixels rendered before frame_done are
+# visible to the controlling process after wait_ready, also on weakly
+# ordered CPUs (e.g. ARM).
+#
+
+import multiprocessing
+import sys
+from circuitpython_dotstarapa102.dotstarapa102 import DotStarAPA102
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # Python older than 3.8. The module still imports (e.g. for the
+    # documentation build), SharedFrameBuffer checks for shared_memory.
+    shared_memory = None
+
+_STOPPED = 0
+_REQUESTED = 1
+
+
+def _align(size):
+    return (size + 7) & ~7
+
+
+class SharedFrameBuffer:
+    """
+    DotStarAPA102 transmit buffers in shared memory, so that worker processes
+    can render frames while the controlling process transmits them.
+
+    Each slot is a complete transmit buffer, used as px by DotStarAPA102
+    instances in every process (see strip). Workers render disjoint pixel
+    ranges of the same frame (several workers per slot), alternate frames
+    (one worker per slot), or both. A frame is handed over with a
+    request/done sequence protocol:
+
+    * controlling process: request(frame), wait_ready(frame), show, request the next frame
+    * worker w: frame = wait_request(w), render into its slot, frame_done(w, frame)
+
+    Waiting is done on a multiprocessing.Condition per slot, which also orders
+    the pixel writes of the workers with the transmits of the controlling
+    process. The condition variables cannot be looked up by name, so the
+    instance itself is passed to the worker processes as a
+    multiprocessing.Process argument; it attaches to the shared memory there.
+    **Requires Python 3.8 or later (multiprocessing.shared_memory).**
+    """
+    def __init__(self, num_px, workers=1, slots=1, name=None, context=None):
+        """
+        Create the shared memory for an instance of SharedFrameBuffer.
+
+        :param num_px: Number of pixels in the DotStar/APA102 string.
+        :param workers: Number of worker processes.
+        :param slots: Number of frame buffers, 1 to workers. Consecutive frames
+            are rendered into consecutive slots.
+        :param name: Name of the shared memory block, or None for a generated name.
+        :param context: multiprocessing context the worker processes are started
+            with, or None for the default context.
+        """
+        if shared_memory is None:
+            raise RuntimeError("SharedFrameBuffer requires Python 3.8 or later")
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if slots < 1 or slots > workers:
+            raise ValueError("slots must be in the range 1-workers")
+        if context is None:
+            context = multiprocessing.get_context()
+        self.num_px = num_px
+        self.workers = workers
+        self.slots = slots
+        self._conditions = [context.Condition() for _ in range(slots)]
+        self._shm = shared_memory.SharedMemory(
+            name=name, create=True,
+            size=self._control_length() + (slots * _align(self.slot_size)))
+        self._map_control()
+        control = self._control
+        control[_STOPPED] = 0
+        for x in range(_REQUESTED, _REQUESTED + slots + workers):
+            control[x] = -1
+        # All pixels off, in any color order (the header is the first byte)
+        body = b"\xE0\x00\x00\x00" * num_px
+        for slot in range(slots):
+            self.buffer(slot)[4:4 + len(body)] = body
+
+    def __getstate__(self):
+        """
+        Pickles the instance for a worker process (see multiprocessing.Process).
+        """
+        return self.num_px, self.workers, self.slots, self._shm.name, self._conditions
+
+    def __setstate__(self, state):
+        """
+        Attaches to the shared memory in a worker process.
+        """
+        self.num_px, self.workers, self.slots, name, self._conditions = state
+        self._shm = _attach_shared_memory(name)
+        self._map_control()
+
+    @property
+    def slot_size(self):
+        """
+        Returns the length of a frame buffer in bytes.
+        """
+        return DotStarAPA102.transmit_length(self.num_px)
+
+    @property
+    def name(self):
+        """
+        Returns the name of the shared memory block.
+        """
+        return self._shm.name
+
+    def _control_length(self):
+        return _align(8 * (_REQUESTED + self.slots + self.workers))
+
+    def _map_control(self):
+        self._control_size = self._control_length()
+        self._control = self._shm.buf[:self._control_size].cast("q")
+        self._done = _REQUESTED + self.slots
+
+    def buffer(self, slot=0):
+        """
+        Returns a frame buffer.
+
+        :param slot: Slot number, 0 to slots - 1.
+        :return: memoryview of the transmit buffer of the slot.
+        """
+        if slot < 0 or slot >= self.slots:
+            raise ValueError("slot must be in the range 0-{0}".format(self.slots - 1))
+        start = self._control_size + (slot * _align(self.slot_size))
+        return self._shm.buf[start:start + self.slot_size]
+
+    def strip(self, spi, slot=0, order='bgr', **kwargs):
+        """
+        Create a DotStarAPA102 instance whose px is a frame buffer.
+        Workers pass None for spi, worker w renders into slot w % slots.
+
+        :param spi: An SPIDevice instance, or None for an instance that only renders.
+        :param slot: Slot number, 0 to slots - 1.
+        :param order: Order of the color components.
+        :param kwargs: Other DotStarAPA102 arguments (chunk_size, latch_zeros).
+        :return: DotStarAPA102 instance.
+        """
+        return DotStarAPA102(spi, self.num_px, order=order, buffer=self.buffer(slot), **kwargs)
+
+    def request(self, frame):
+        """
+        Ask the workers to render a frame into slot frame % slots. The previous
+        frame of that slot must have been transmitted (or snapshotted by show_async).
+
+        :param frame: Frame number. Frames are requested in increasing order, starting at 0.
+        :return: None.
+        """
+        slot = frame % self.slots
+        condition = self._conditions[slot]
+        with condition:
+            self._control[_REQUESTED + slot] = frame
+            condition.notify_all()
+
+    def ready(self, frame):
+        """
+        Returns True if every worker of the frame's slot has rendered the frame.
+
+        :param frame: Frame number.
+        :return: True if the frame is ready to be transmitted.
+        """
+        with self._conditions[frame % self.slots]:
+            return self._ready(frame)
+
+    def _ready(self, frame):
+        control = self._control
+        for worker in range(frame % self.slots, self.workers, self.slots):
+            if control[self._done + worker] < frame:
+                return False
+        return True
+
+    def wait_ready(self, frame, timeout=None):
+        """
+        Wait until a frame has been rendered by all of its workers. The frame can
+        then be transmitted from slot frame % slots (after mark_dirty).
+
+        :param frame: Frame number.
+        :param timeout: Maximum wait in seconds. None waits forever.
+        :return: True if the frame is ready, False on timeout.
+        """
+        condition = self._conditions[frame % self.slots]
+        with condition:
+            return condition.wait_for(lambda: self._ready(frame), timeout)
+
+    def wait_request(self, worker, timeout=None):
+        """
+        Wait for the next frame to be rendered by a worker.
+
+        :param worker: Worker number, 0 to workers - 1.
+        :param timeout: Maximum wait in seconds. None waits forever.
+        :return: Frame number, or None on timeout or when stopped.
+        """
+        control = self._control
+        slot = _REQUESTED + (worker % self.slots)
+        done = self._done + worker
+        condition = self._conditions[worker % self.slots]
+        with condition:
+            if not condition.wait_for(lambda: control[_STOPPED] or control[slot] > control[done],
+                                      timeout):
+                return None
+            if control[_STOPPED]:
+                return None
+            return control[slot]
+
+    def frame_done(self, worker, frame):
+        """
+        Report that a worker has finished rendering a frame.
+
+        :param worker: Worker number, 0 to workers - 1.
+        :param frame: Frame number returned by wait_request.
+        :return: None.
+        """
+        condition = self._conditions[worker % self.slots]
+        with condition:
+            self._control[self._done + worker] = frame
+            condition.notify_all()
+
+    def stop(self):
+        """
+        Tell the workers to stop. Pending and future wait_request calls return None.
+
+        :return: None.
+        """
+        for condition in self._conditions:
+            with condition:
+                self._control[_STOPPED] = 1
+                condition.notify_all()
+
+    def close(self):
+        """
+        Detach from the shared memory. DotStarAPA102 instances created by strip
+        must be deleted first, as they hold views of the frame buffers.
+
+        :return: None.
+        """
+        if self._control is not None:
+            self._control.release()
+            self._control = None
+            try:
+                self._shm.close()
+            except BufferError:
+                # A forked worker inherits the views of the controlling process,
+                # the mapping is then released when the worker exits
+                pass
+
+    def unlink(self):
+        """
+        Free the shared memory. Called once, by the creating process, after close.
+
+        :return: None.
+        """
+        self._shm.unlink()
+
+
+def _attach_shared_memory(name):
+    """
+    Attach to an existing shared memory block. An attaching process must not
+    free the block at exit, so it is not tracked where Python allows it.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+#
+# Background (double buffered) transmit for DotStarAPA102
+# Copyright © 2018  Dave Hocker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# See the LICENSE.md file for more details.
+#
+
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+
+class BackgroundTransmitter:
+    """
+    Transmits snapshots of a DotStarAPA102 frame from a dedicated worker thread.
+
+    Each submitted frame is copied into one of a fixed pool of snapshot buffers
+    and queued for the worker. The caller is free to change the pixels as soon as
+    submit returns. When every snapshot buffer is queued or in transmission the
+    configured policy applies back-pressure: "block" waits for a buffer to free up
+    and "drop" drops the new frame.
+
+    Normally created by DotStarAPA102.start_async (or the first show_async call)
+    rather than directly. **Requires threading support (CPython).**
+    """
+    def __init__(self, strip, buffers=2, policy="block", timeout=None):
+        """
+        Initialize and start a background transmitter.
+
+        :param strip: The DotStarAPA102 instance whose frames are transmitted.
+        :param buffers: Number of snapshot buffers, at least 1.
+        :param policy: "block" or "drop". See class description.
+        :param timeout: Maximum time in seconds to block for a free buffer. None waits forever.
+        """
+        if buffers < 1:
+            raise ValueError("buffers must be at least 1")
+        if policy not in ("block", "drop"):
+            raise ValueError("policy must be 'block' or 'drop'")
+        self.strip = strip
+        self.policy = policy
+        self.timeout = timeout
+        self.frames_dropped = 0
+        # A partial frame plus its end frame is never longer than a full frame
+        self._free = [bytearray(len(strip.px)) for _ in range(buffers)]
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._in_flight = False
+        self._worker = threading.Thread(target=self._run, name="DotStarAPA102-transmit")
+        self._worker.daemon = True
+        self._worker.start()
+
+    @staticmethod
+    def done(result):
+        """
+        Create an already completed future.
+
+        :param result: Result of the future.
+        :return: Completed concurrent.futures.Future.
+        """
+        future = Future()
+        future.set_result(result)
+        return future
+
+    def submit(self, *buffers):
+        """
+        Snapshot the given buffers and queue them for transmission as one frame.
+
+        :param buffers: Buffers making up the frame, in transmit order.
+        :return: Tuple (queued, future). queued is False if the frame was dropped.
+            The result of the concurrent.futures.Future is True once the frame has been
+            transmitted (or the transmit exception), or False if the frame was dropped.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Background transmitter is closed")
+            if not self._free:
+                if self.policy == "drop":
+                    self.frames_dropped += 1
+                    return False, self.done(False)
+                if not self._cond.wait_for(lambda: self._free, timeout=self.timeout):
+                    self.frames_dropped += 1
+                    return False, self.done(False)
+            snapshot = self._free.pop()
+        # Copy outside of the lock, the worker never touches a free buffer
+        length = 0
+        for buf in buffers:
+            snapshot[length:length + len(buf)] = buf
+            length += len(buf)
+        future = Future()
+        with self._cond:
+            self._queue.append((snapshot, length, future))
+            self._cond.notify_all()
+        return True, future
+
+    @property
+    def busy(self):
+        """
+        Returns True while frames are queued or being transmitted.
+
+        :return: True if busy.
+        """
+        with self._cond:
+            return self._busy()
+
+    def flush(self, timeout=None):
+        """
+        Wait until all queued frames have been transmitted.
+
+        :param timeout: Maximum wait in seconds. None waits forever.
+        :return: True if all frames were transmitted within the timeout.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._busy(), timeout=timeout)
+
+    def close(self):
+        """
+        Transmit any queued frames and stop the worker thread.
+
+        :return: None.
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._worker.join()
+
+    def _busy(self):
+        # Caller holds the lock
+        return bool(self._queue) or self._in_flight
+
+    def _run(self):
+        """
+        Worker thread. Transmits queued snapshots in order.
+        """
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._closed)
+                if not self._queue:
+                    return
+                snapshot, length, future = self._queue.popleft()
+                self._in_flight = True
+            if future.set_running_or_notify_cancel():
+                try:
+                    self.strip._transmit(memoryview(snapshot)[:length])
+                except Exception as ex:  # pylint: disable=broad-except
+                    future.set_exception(ex)
+                else:
+                    future.set_result(True)
+            with self._cond:
+                self._in_flight = False
+                self._free.append(snapshot)
+                self._cond.notify_all()
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+#
+# Regression benchmark suite for the DotStarAPA102 driver. No hardware required.
+# Copyright © 2018  Dave Hocker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# See the LICENSE.md file for more details.
+#
+# Usage:
+#   python examples/dotstarapa102_bench_suite.py [--json results.json]
+#       [--compare baseline.json] [--threshold 0.2] [--wire-time] [--baudrate 15000000]
+#
+# With --compare the exit status is 1 if any result is slower than the
+# baseline by more than the threshold.
+#
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from fake_spi import fake_spi_device
+from circuitpython_dotstarapa102.dotstarapa102 import DotStarAPA102
+
+SIZES = (30, 100, 300, 1000, 3000, 10000)
+# Minimum measuring time per result, in seconds
+MIN_TIME = 0.2
+
+
+def operations(ds):
+    """
+    Returns (name, function) pairs for the operations to be measured.
+    Each function performs one operation per call.
+    """
+    num_px = ds.num_pixels
+    state = {"i": 0}
+
+    def set_pixel_color():
+        i = state["i"] = (state["i"] + 1) % num_px
+        ds.set_pixel_color(i, 0x102030)
+
+    def set_pixel_rgb():
+        i = state["i"] = (state["i"] + 1) % num_px
+        ds.set_pixel_rgb(i, 0x10, 0x20, 0x30)
+
+    frame = bytes(num_px * 3)
+
+    return [
+        ("set_pixel_color", set_pixel_color),
+        ("set_pixel_rgb", set_pixel_rgb),
+        ("set_pixels", lambda: ds.set_pixels(frame)),
+        ("fill_rgb", lambda: ds.fill_rgb(0x10, 0x20, 0x30)),
+        ("clear", lambda: ds.clear(show=False)),
+        ("show", lambda: ds.show(force=True)),
+    ]
+
+
+def measure(func):
+    """
+    Measure a function.
+
+    :return: (calls per second, bytes retained per call, peak bytes allocated by a call).
+        The peak is None before Python 3.9.
+    """
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_TIME:
+            break
+        calls *= 2
+    rate = calls / elapsed
+
+    samples = min(calls, 1000)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for _ in range(samples):
+        func()
+    diff = tracemalloc.take_snapshot().compare_to(before, "filename")
+    tracemalloc.stop()
+    retained = sum(stat.size_diff for stat in diff if stat.size_diff > 0)
+
+    peak = None
+    if hasattr(tracemalloc, "reset_peak"):
+        peak = 0
+        tracemalloc.start()
+        for _ in range(min(samples, 100)):
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            func()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+        tracemalloc.stop()
+    return rate, retained / float(samples), peak
+
+
+def run(sizes, baudrate, wire_time):
+    results = []
+    for num_px in sizes:
+        ds = DotStarAPA102(fake_spi_device(baudrate=baudrate, wire_time=wire_time), num_px)
+        for name, func in operations(ds):
+            rate, retained, peak = measure(func)
+            results.append({
+                "op": name,
+                "pixels": num_px,
+                "ops_per_sec": rate,
+                "bytes_retained_per_op": retained,
+                "peak_bytes_per_op": peak,
+            })
+            unit = "frames/s" if name == "show" else "ops/s"
+            print("%-16s %6d px %14.1f %-8s %8.1f B retained %8s B peak" %
+                  (name, num_px, rate, unit, retained, peak))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results with a baseline run.
+
+    :return: List of descriptions of the regressions found.
+    """
+    previous = {(r["op"], r["pixels"]): r["ops_per_sec"] for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = previous.get((result["op"], result["pixels"]))
+        if old and result["ops_per_sec"] < old * (1.0 - threshold):
+            regressions.append("%s %d px: %.1f ops/s, baseline %.1f ops/s" %
+                               (result["op"], result["pixels"], result["ops_per_sec"], old))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DotStarAPA102 benchmark suite")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--compare", help="Baseline results file to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed slowdown against the baseline (fraction)")
+    parser.add_argument("--wire-time", action="store_true",
+                        help="Simulate SPI wire time in show")
+    parser.add_argument("--baudrate", type=int, default=15000000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    args = parser.parse_args()
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "baudrate": args.baudrate,
+        "wire_time": args.wire_time,
+        "results": run(args.sizes, args.baudrate, args.wire_time),
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            found = compare(report["results"], json.load(f), args.threshold)
+        for regression in found:
+            print("REGRESSION", regression)
+        sys.exit(1 if found else 0)
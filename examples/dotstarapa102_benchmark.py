@@ -0,0 +1,422 @@
+# -*- coding: utf-8 -*-
+#
+# Benchmarks for the DotStarAPA102 driver. No hardware required.
+# Copyright © 2018  Dave Hocker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# See the LICENSE.md file for more details.
+#
+
+import array
+import math
+import multiprocessing
+import timeit
+import tracemalloc
+from fake_spi import fake_spi_device
+from circuitpython_dotstarapa102.dotstarapa102 import DotStarAPA102
+from circuitpython_dotstarapa102.multistrip import MultiStripController
+from circuitpython_dotstarapa102.layout import MatrixLayout
+from circuitpython_dotstarapa102.palette import Palette
+from circuitpython_dotstarapa102.hdr import set_pixels_hdr
+from circuitpython_dotstarapa102.blend import capture, Fade
+from circuitpython_dotstarapa102.sharedframe import SharedFrameBuffer
+
+NUM_PIXELS = 1200
+REPEAT = 20
+
+
+def report(name, seconds, baseline=None):
+    ms = seconds * 1000.0 / REPEAT
+    if baseline:
+        print("  %-28s %9.3f ms  (%.1fx)" % (name, ms, baseline / seconds))
+    else:
+        print("  %-28s %9.3f ms" % (name, ms))
+
+
+def bench_frame_upload(ds):
+    print("Full frame upload, %d pixels" % ds.num_pixels)
+    frame = bytes(range(256)) * ((ds.num_pixels * 3) // 256 + 1)
+    frame = frame[:ds.num_pixels * 3]
+
+    def per_pixel():
+        for i in range(ds.num_pixels):
+            x = i * 3
+            ds.set_pixel_rgb(i, frame[x], frame[x + 1], frame[x + 2])
+
+    def bulk():
+        ds.set_pixels(frame, fmt="rgb")
+
+    base = timeit.timeit(per_pixel, number=REPEAT)
+    report("set_pixel_rgb loop", base)
+    report("set_pixels", timeit.timeit(bulk, number=REPEAT), base)
+
+
+def bench_fill(ds):
+    print("Fill and clear, %d pixels" % ds.num_pixels)
+
+    def per_pixel():
+        for i in range(ds.num_pixels):
+            ds.set_pixel_brgb(i, 31, 0x10, 0x20, 0x30)
+
+    base = timeit.timeit(per_pixel, number=REPEAT)
+    report("set_pixel_brgb loop", base)
+    report("fill_rgb", timeit.timeit(lambda: ds.fill_rgb(0x10, 0x20, 0x30), number=REPEAT), base)
+    report("clear(show=False)", timeit.timeit(lambda: ds.clear(show=False), number=REPEAT), base)
+    report("__init__", timeit.timeit(lambda: DotStarAPA102(ds.spi, ds.num_pixels), number=REPEAT))
+
+
+def bench_rotate(ds):
+    print("Scroll pattern by one pixel, %d pixels" % ds.num_pixels)
+    colors = [(i * 0x010203) & 0xFFFFFF for i in range(ds.num_pixels)]
+    state = {"offset": 0}
+
+    def per_pixel():
+        offset = state["offset"] = state["offset"] + 1
+        for i in range(ds.num_pixels):
+            ds.set_pixel_color(i, colors[(i + offset) % len(colors)])
+
+    base = timeit.timeit(per_pixel, number=REPEAT)
+    report("set_pixel_color loop", base)
+    report("rotate", timeit.timeit(lambda: ds.rotate(-1), number=REPEAT), base)
+
+
+def bench_sparse(ds, count=300):
+    print("Sparse update of %d of %d pixels" % (count, ds.num_pixels))
+    indices = array.array("H", [(i * 7919) % ds.num_pixels for i in range(count)])
+    colors = array.array("L", [(i * 0x3F1A2B) & 0xFFFFFF for i in range(count)])
+
+    def per_pixel():
+        for pixel, color in zip(indices, colors):
+            ds.set_pixel_color(pixel, color)
+
+    base = timeit.timeit(per_pixel, number=REPEAT)
+    report("set_pixel_color loop", base)
+    report("set_pixels_at", timeit.timeit(lambda: ds.set_pixels_at(indices, colors),
+                                          number=REPEAT), base)
+
+
+def bench_correction(ds):
+    print("Gamma/white balance correction, %d pixels" % ds.num_pixels)
+    frame = bytes(range(256)) * ((ds.num_pixels * 3) // 256 + 1)
+    balance = (1.0, 0.8, 0.7)
+
+    def per_pixel():
+        for i in range(ds.num_pixels):
+            x = i * 3
+            ds.set_pixel_rgb(i, int(255 * balance[0] * (frame[x] / 255.0) ** 2.2),
+                             int(255 * balance[1] * (frame[x + 1] / 255.0) ** 2.2),
+                             int(255 * balance[2] * (frame[x + 2] / 255.0) ** 2.2))
+        ds.show()
+
+    def tables():
+        ds.set_pixels(frame[:ds.num_pixels * 3])
+        ds.show()
+
+    base = timeit.timeit(per_pixel, number=REPEAT)
+    report("per-pixel correction", base)
+    ds.set_color_correction(gamma=2.2, balance=balance)
+    report("correction tables", timeit.timeit(tables, number=REPEAT), base)
+    ds.clear_color_correction()
+
+
+def bench_numpy(ds):
+    try:
+        import numpy
+    except ImportError:
+        print("NumPy not installed, skipping pixels_array benchmark")
+        return
+    print("NumPy effect frame, %d pixels" % ds.num_pixels)
+    phase = numpy.linspace(0, 2 * numpy.pi, ds.num_pixels)
+    effect = numpy.empty((ds.num_pixels, 3), dtype=numpy.uint8)
+    effect[:, 0] = 127 + 127 * numpy.sin(phase)
+    effect[:, 1] = 127 + 127 * numpy.cos(phase)
+    effect[:, 2] = 64
+
+    def per_pixel():
+        for i, (r, g, b) in enumerate(effect.tolist()):
+            ds.set_pixel_rgb(i, r, g, b)
+
+    pixels = ds.pixels_array
+
+    def view():
+        pixels[:, ds.red_x] = effect[:, 0]
+        pixels[:, ds.green_x] = effect[:, 1]
+        pixels[:, ds.blue_x] = effect[:, 2]
+        ds.mark_dirty()
+
+    base = timeit.timeit(per_pixel, number=REPEAT)
+    report("tolist + set_pixel_rgb loop", base)
+    report("pixels_array", timeit.timeit(view, number=REPEAT), base)
+    report("set_pixels(ndarray)", timeit.timeit(lambda: ds.set_pixels(effect), number=REPEAT),
+           base)
+
+
+def bench_layout(ds, width=40):
+    height = ds.num_pixels // width
+    print("Serpentine %dx%d image blit" % (width, height))
+    image = bytes(range(256)) * ((width * height * 3) // 256 + 1)
+    image = image[:width * height * 3]
+
+    def per_pixel():
+        for y in range(height):
+            for x in range(width):
+                pixel = (y * width) + (width - 1 - x if y & 1 else x)
+                i = ((y * width) + x) * 3
+                ds.set_pixel_rgb(pixel, image[i], image[i + 1], image[i + 2])
+
+    layout = MatrixLayout(ds, width, height)
+    base = timeit.timeit(per_pixel, number=REPEAT)
+    report("(x, y) math + set_pixel_rgb", base)
+    report("MatrixLayout.blit", timeit.timeit(lambda: layout.blit(image), number=REPEAT), base)
+
+    # Rotated by 90 degrees, every canvas row crosses all of the panel rows
+    layout = MatrixLayout(ds, height, width, rotation=90)
+    print("Serpentine %dx%d panel rotated 90 degrees, %dx%d image blit" %
+          (height, width, layout.width, layout.height))
+    strip_table = [pixel for _, pixel in layout.table]
+
+    def per_pixel_rotated():
+        for i, pixel in enumerate(strip_table):
+            ds.set_pixel_rgb(pixel, image[i * 3], image[(i * 3) + 1], image[(i * 3) + 2])
+
+    base = timeit.timeit(per_pixel_rotated, number=REPEAT)
+    report("index table + set_pixel_rgb", base)
+    report("MatrixLayout.blit", timeit.timeit(lambda: layout.blit(image), number=REPEAT), base)
+
+
+def bench_blend(ds, steps=REPEAT):
+    print("Cross-fade step, %d pixels" % ds.num_pixels)
+    ds.fill_rgb(0xFF, 0x80, 0x00)
+    source = [ds.get_pixel_color(i) for i in range(ds.num_pixels)]
+    ds.fill_rgb(0x00, 0x40, 0xFF)
+    target_colors = [ds.get_pixel_color(i) for i in range(ds.num_pixels)]
+    target = capture(ds)
+    state = {"n": 0}
+
+    def per_pixel():
+        n = state["n"] = state["n"] % steps + 1
+        for i, (a, b) in enumerate(zip(source, target_colors)):
+            ds.set_pixel_rgb(i, a[0] + (b[0] - a[0]) * n // steps,
+                             a[1] + (b[1] - a[1]) * n // steps,
+                             a[2] + (b[2] - a[2]) * n // steps)
+
+    base = timeit.timeit(per_pixel, number=steps)
+    report("per-pixel interpolation", base)
+    for use_numpy in (False, True):
+        ds.fill_rgb(0xFF, 0x80, 0x00)
+        fade = Fade(ds, target, steps, use_numpy=use_numpy)
+        name = "Fade.step (NumPy)" if use_numpy else "Fade.step"
+        report(name, timeit.timeit(fade.step, number=steps), base)
+
+
+def bench_hdr(ds):
+    print("HDR frame (16 bit per channel), %d pixels" % ds.num_pixels)
+    frame = array.array("H", [(i * 97) & 0xFFFF for i in range(ds.num_pixels * 3)])
+    report("set_pixels_hdr", timeit.timeit(lambda: set_pixels_hdr(ds, frame), number=REPEAT))
+    try:
+        import numpy
+    except ImportError:
+        return
+    frame = numpy.array(frame, dtype=numpy.uint16)
+    report("set_pixels_hdr (NumPy)", timeit.timeit(lambda: set_pixels_hdr(ds, frame),
+                                                   number=REPEAT))
+
+
+def bench_palette(ds):
+    print("Palette color cycle step and show, %d pixels" % ds.num_pixels)
+    palette = [((i * 5) & 0xFF, (i * 3) & 0xFF, 255 - i) for i in range(256)]
+    indexes = bytes((i * 7) & 0xFF for i in range(ds.num_pixels))
+    step = [0]
+
+    def per_pixel():
+        step[0] += 1
+        for i in range(ds.num_pixels):
+            ds.set_pixel_rgb(i, *palette[(indexes[i] + step[0]) & 0xFF])
+        ds.show()
+
+    base = timeit.timeit(per_pixel, number=REPEAT)
+    report("set_pixel_rgb loop", base)
+    mode = Palette(ds, palette)
+    mode.set_pixel_indexes(indexes)
+
+    def cycle():
+        mode.rotate(1)
+        ds.show()
+
+    report("Palette.rotate", timeit.timeit(cycle, number=REPEAT), base)
+    mode.close()
+
+
+def bench_power_limit(ds):
+    print("Power estimate before show, %d pixels" % ds.num_pixels)
+    frame = bytes(range(256)) * ((ds.num_pixels * 3) // 256 + 1)
+    frame = frame[:ds.num_pixels * 3]
+
+    def summed():
+        ds.set_pixel_rgb(0, 255, 0, 0)
+        ma = 0.0
+        for i in range(ds.num_pixels):
+            r, g, b = ds.get_pixel_color(i)
+            ma += (r + g + b) * 20.0 / 255
+        return ma
+
+    base = timeit.timeit(summed, number=REPEAT)
+    report("sum every channel", base)
+    ds.set_pixels(frame)
+    ds.set_power_limit(2000.0)
+
+    def incremental():
+        ds.set_pixel_rgb(0, 255, 0, 0)
+        return ds.power_ma
+
+    report("set_power_limit, power_ma", timeit.timeit(incremental, number=REPEAT), base)
+    report("set_pixels with power limit", timeit.timeit(lambda: ds.set_pixels(frame),
+                                                        number=REPEAT))
+    ds.clear_power_limit()
+
+
+def bench_show_async(num_px, frames=50):
+    print("Render + show with simulated wire time, %d pixels, %d frames" % (num_px, frames))
+    ds = DotStarAPA102(fake_spi_device(baudrate=8000000, wire_time=True), num_px)
+
+    def render(n):
+        # Stand-in for per-pixel effect code
+        for i in range(num_px):
+            ds.set_pixel_rgb(i, (i + n) & 0xFF, 0, 0)
+
+    def blocking():
+        for n in range(frames):
+            render(n)
+            ds.show()
+
+    def overlapped():
+        for n in range(frames):
+            render(n)
+            ds.show_async()
+        ds.stop_async()
+
+    base = timeit.timeit(blocking, number=1)
+    print("  %-28s %9.3f ms/frame" % ("show", base * 1000.0 / frames))
+    t = timeit.timeit(overlapped, number=1)
+    print("  %-28s %9.3f ms/frame  (%.1fx)" % ("show_async", t * 1000.0 / frames, base / t))
+
+
+def bench_multi_strip(num_strips, num_px, frames=10):
+    print("%d strings of %d pixels with simulated wire time, %d frames" %
+          (num_strips, num_px, frames))
+    strips = [DotStarAPA102(fake_spi_device(baudrate=8000000, wire_time=True), num_px)
+              for _ in range(num_strips)]
+
+    def sequential():
+        for strip in strips:
+            strip.show(force=True)
+
+    base = timeit.timeit(sequential, number=frames)
+    print("  %-28s %9.3f ms/frame" % ("show one after another", base * 1000.0 / frames))
+    with MultiStripController(strips) as controller:
+        t = timeit.timeit(lambda: controller.show_all(force=True), number=frames)
+    print("  %-28s %9.3f ms/frame  (%.1fx)" % ("show_all", t * 1000.0 / frames, base / t))
+
+
+def bench_chunked_show(sizes=(100, 1000, 5000, 10000), chunk_size=4096, frames=50):
+    print("Chunked show, %d byte chunks, no wire time" % chunk_size)
+    for num_px in sizes:
+        ds = DotStarAPA102(fake_spi_device(), num_px, chunk_size=chunk_size)
+        t = timeit.timeit(lambda: ds.show(force=True), number=frames) / frames
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        for _ in range(frames):
+            ds.show(force=True)
+        stats = tracemalloc.take_snapshot().compare_to(before, "filename")
+        tracemalloc.stop()
+        allocated = sum(stat.size_diff for stat in stats if stat.size_diff > 0)
+        print("  %6d pixels %9.3f ms  %8.1f MB/s  %6.1f bytes allocated/frame" %
+              (num_px, t * 1000.0, len(ds.px) / t / 1e6, allocated / float(frames)))
+
+
+def render_noise(strip, frame, start, end):
+    # A deliberately heavy pure Python effect
+    for i in range(start, end):
+        v = 0.0
+        for k in range(1, 9):
+            v += math.sin((i * 0.05 * k) + (frame * 0.1)) / k
+        c = int((v + 2.0) * 60.0) & 0xFF
+        strip.set_pixel_rgb(i, c, 255 - c, frame & 0xFF)
+
+
+def render_worker(shared, worker):
+    strip = shared.strip(None, worker % shared.slots)
+    num_px = shared.num_px
+    start = worker * num_px // shared.workers
+    end = (worker + 1) * num_px // shared.workers
+    while True:
+        frame = shared.wait_request(worker)
+        if frame is None:
+            break
+        render_noise(strip, frame, start, end)
+        shared.frame_done(worker, frame)
+    del strip
+    shared.close()
+
+
+def bench_multiprocess_render(num_px, workers=None, frames=20):
+    workers = workers or multiprocessing.cpu_count()
+    print("Heavy render, %d pixels, %d worker processes, %d frames" % (num_px, workers, frames))
+    ds = DotStarAPA102(fake_spi_device(), num_px)
+
+    def single():
+        for frame in range(frames):
+            render_noise(ds, frame, 0, num_px)
+            ds.show()
+
+    base = timeit.timeit(single, number=1)
+    print("  %-28s %9.3f ms/frame" % ("render in one process", base * 1000.0 / frames))
+    # One slot, every worker renders a disjoint range of each frame
+    shared = SharedFrameBuffer(num_px, workers=workers)
+    strip = shared.strip(fake_spi_device())
+    processes = [multiprocessing.Process(target=render_worker, args=(shared, w))
+                 for w in range(workers)]
+    for process in processes:
+        process.start()
+
+    def shared_render():
+        for frame in range(1, frames + 1):
+            shared.request(frame)
+            shared.wait_ready(frame)
+            strip.mark_dirty()
+            strip.show()
+
+    # Let the workers start before timing
+    shared.request(0)
+    shared.wait_ready(0)
+    t = timeit.timeit(shared_render, number=1)
+    print("  %-28s %9.3f ms/frame  (%.1fx)" %
+          ("SharedFrameBuffer workers", t * 1000.0 / frames, base / t))
+    shared.stop()
+    for process in processes:
+        process.join()
+    del strip
+    shared.close()
+    shared.unlink()
+
+
+if __name__ == "__main__":
+    strip = DotStarAPA102(fake_spi_device(), NUM_PIXELS)
+    bench_frame_upload(strip)
+    bench_fill(strip)
+    bench_rotate(strip)
+    bench_sparse(strip)
+    bench_correction(strip)
+    bench_numpy(strip)
+    bench_layout(strip)
+    bench_blend(strip)
+    bench_hdr(strip)
+    bench_palette(strip)
+    bench_power_limit(strip)
+    bench_show_async(NUM_PIXELS * 2)
+    bench_multi_strip(4, NUM_PIXELS)
+    bench_chunked_show()
+    bench_multiprocess_render(NUM_PIXELS)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+#
+# Loopback test of the Open Pixel Control server. No hardware required.
+# Copyright © 2018  Dave Hocker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# See the LICENSE.md file for more details.
+#
+# Starts an OPCServer for two strings on fake SPI buses, sends frames to it
+# over TCP and UDP on 127.0.0.1 and checks that the last frame of each
+# string reaches its SPI bus.
+#
+
+import asyncio
+import socket
+import struct
+import sys
+import time
+from fake_spi import fake_spi_device
+from circuitpython_dotstarapa102.dotstarapa102 import DotStarAPA102
+from circuitpython_dotstarapa102.opc import OPCServer
+
+NUM_PIXELS = 300
+FRAMES = 100
+
+
+def opc_message(channel, frame_number, num_px):
+    data = b"".join(bytes(((i + frame_number) & 0xFF, i & 0xFF, frame_number & 0xFF))
+                    for i in range(num_px))
+    return struct.pack(">BBH", channel, 0, len(data)) + data
+
+
+def expected_body(strip, message):
+    # LED frames of the pixels in a message, in the color order of the string
+    data = message[4:]
+    body = bytearray(strip.num_pixels * 4)
+    body[strip.brightness_x::4] = bytes((0xE0 | strip.global_brightness,)) * strip.num_pixels
+    body[strip.red_x::4] = data[0::3]
+    body[strip.green_x::4] = data[1::3]
+    body[strip.blue_x::4] = data[2::3]
+    return bytes(body)
+
+
+async def wait_for_body(strip, body, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    writes = strip.spi.spi.writes
+    while time.monotonic() < deadline:
+        if writes and writes[-1][strip.body_x:strip.end_x] == body:
+            return True
+        await asyncio.sleep(0.01)
+    return False
+
+
+async def main():
+    strips = [DotStarAPA102(fake_spi_device(baudrate=8000000, record=True, wire_time=True),
+                            NUM_PIXELS) for _ in range(2)]
+    server = OPCServer(strips)
+    await server.start("127.0.0.1", port=0, udp_port=0)
+    tcp_port = udp_port = None
+    for sock in server.sockets:
+        if sock.type == socket.SOCK_STREAM:
+            tcp_port = sock.getsockname()[1]
+        else:
+            udp_port = sock.getsockname()[1]
+
+    # TCP, string 1. Messages are written in odd sized pieces, so they arrive
+    # split across reads and the receive buffer has to keep partial messages.
+    reader, writer = await asyncio.open_connection("127.0.0.1", tcp_port)
+    stream = b"".join(opc_message(1, n, NUM_PIXELS) for n in range(FRAMES))
+    for x in range(0, len(stream), 1001):
+        writer.write(stream[x:x + 1001])
+        await writer.drain()
+    last_tcp = opc_message(1, FRAMES - 1, NUM_PIXELS)
+
+    # UDP, string 2
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        asyncio.DatagramProtocol, remote_addr=("127.0.0.1", udp_port))
+    for n in range(10):
+        transport.sendto(opc_message(2, n, NUM_PIXELS))
+        await asyncio.sleep(0.001)
+    last_udp = opc_message(2, 9, NUM_PIXELS)
+
+    ok = await wait_for_body(strips[0], expected_body(strips[0], last_tcp))
+    ok = await wait_for_body(strips[1], expected_body(strips[1], last_udp)) and ok
+    print("messages %d, frames coalesced %d, SPI writes %d and %d" %
+          (server.messages, server.frames_coalesced,
+           len(strips[0].spi.spi.writes), len(strips[1].spi.spi.writes)))
+    print("last frames received: %s" % ("ok" if ok else "FAILED"))
+
+    writer.close()
+    transport.close()
+    await server.close()
+    for strip in strips:
+        strip.stop_async()
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(main()) else 1)
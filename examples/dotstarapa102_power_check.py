@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+#
+# Check of the power limit estimate. No hardware required.
+# Copyright © 2018  Dave Hocker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# See the LICENSE.md file for more details.
+#
+# Sets pixels with a random mix of all the setters, with and without color
+# correction, and checks after each call that the running power estimate
+# equals a full recount. Then checks that limited frames, as transmitted,
+# stay within the budget and that color correction is taken into account.
+#
+
+import array
+import random
+import sys
+from fake_spi import fake_spi_device
+from circuitpython_dotstarapa102.dotstarapa102 import DotStarAPA102
+from circuitpython_dotstarapa102.blend import blend
+from circuitpython_dotstarapa102.hdr import set_pixels_hdr
+
+NUM_PIXELS = 100
+CALLS = 3000
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def recount(strip):
+    return strip._power.units(strip.px, strip.body_x, strip.end_x)
+
+
+def random_call(strip, rnd):
+    n = strip.num_pixels
+    b = rnd.randrange(32)
+    r, g, bl = (rnd.randrange(256) for _ in range(3))
+    a = rnd.randrange(n)
+    e = rnd.randrange(a, n + 1)
+    op = rnd.randrange(14)
+    if op == 0:
+        strip.set_pixel_brgb(a, b, r, g, bl)
+    elif op == 1:
+        strip.fill_brgb(b, r, g, bl, a, e)
+    elif op == 2:
+        strip.set_pixels(bytes(rnd.randrange(256) for _ in range(3 * (e - a))), start=a)
+    elif op == 3 and e > a:
+        pixels = range(e - 1, a - 1, -3)
+        strip.set_pixels(bytes(rnd.randrange(256) for _ in range(4 * len(pixels))),
+                         fmt="brgb", start=e - 1, step=-3)
+    elif op == 4:
+        indices = [rnd.randrange(n) for _ in range(rnd.randrange(1, 20))]
+        strip.set_pixels_at(indices, [rnd.randrange(1 << 24) for _ in indices],
+                            brightness=[rnd.randrange(32) for _ in indices])
+    elif op == 5:
+        set_pixels_hdr(strip, array.array("H", [rnd.randrange(65536)
+                                                for _ in range(3 * (e - a))]), start=a)
+    elif op == 6:
+        strip.restamp_brightness(b, a, e)
+    elif op == 7:
+        strip.rotate(rnd.randrange(-50, 50), a, e)
+        strip.shift(rnd.randrange(-50, 50), fill=rnd.randrange(1 << 24), start=a, end=e)
+    elif op == 8:
+        strip[a:e:2] = [rnd.randrange(1 << 24) for _ in range(len(range(a, e, 2)))]
+    elif op == 9:
+        strip.show(partial=rnd.random() < 0.5)
+    elif op == 10:
+        if rnd.random() < 0.5:
+            strip.set_color_correction(gamma=rnd.choice((1.0, 2.2, 2.8)),
+                                       balance=(1.0, 0.8, 0.6))
+        else:
+            strip.clear_color_correction()
+    elif op == 11 and numpy is not None:
+        indices = numpy.array([rnd.randrange(n) for _ in range(rnd.randrange(1, 20))])
+        strip.set_pixels_at(indices, numpy.array([rnd.randrange(1 << 24) for _ in indices]),
+                            brightness=b)
+    elif op == 12 and numpy is not None:
+        set_pixels_hdr(strip, numpy.array([rnd.randrange(65536) for _ in range(3 * (e - a))],
+                                          dtype=numpy.uint16), start=a)
+    elif op == 13:
+        # Direct writes, the estimate is recounted at the next show
+        blend(strip, bytes(n * 4), 0.5)
+    return op
+
+
+def check_incremental(strip, rnd):
+    strip.set_power_limit(500.0, (20.0, 15.0, 18.5), idle_ma=1.0)
+    for call in range(CALLS):
+        op = random_call(strip, rnd)
+        total = strip._power.total
+        if total is not None and total != recount(strip):
+            print("call %d (operation %d): estimate %d, recount %d" %
+                  (call, op, total, recount(strip)))
+            return False
+    return True
+
+
+def transmitted_ma(strip, ma_per_channel):
+    # Current of the frame as it was sent, from the LED frames themselves
+    body = strip.transmitted_body
+    total = 0.0
+    for x in range(0, len(body), 4):
+        level = body[x + strip.brightness_x] & 0x1F
+        for offset, ma in zip((strip.red_x, strip.green_x, strip.blue_x), ma_per_channel):
+            total += ma * (body[x + offset] / 255.0) * (level / 31.0)
+    return total
+
+
+def check_limit(strip):
+    ok = True
+    ma_per_channel = (20.0, 20.0, 20.0)
+    strip.clear_color_correction()
+    strip.set_power_limit(1000.0, ma_per_channel)
+    strip.fill_brgb(31, 255, 255, 255)
+    strip.show()
+    sent = transmitted_ma(strip, ma_per_channel)
+    print("full white: estimate %.0f mA, sent %.0f mA, budget 1000 mA" %
+          (strip.power_ma, sent))
+    ok = ok and sent <= 1000.0
+    # 50% grey with gamma 2.2 transmits about 22% of full current, within a budget
+    # that the uncorrected colors (50%) would exceed
+    strip.set_power_limit(2000.0, ma_per_channel)
+    strip.set_color_correction(gamma=2.2)
+    strip.fill_brgb(31, 128, 128, 128)
+    limited = strip.frames_limited
+    strip.show()
+    sent = transmitted_ma(strip, ma_per_channel)
+    print("50%% grey, gamma 2.2: estimate %.0f mA, sent %.0f mA, budget 2000 mA, limited %s" %
+          (strip.power_ma, sent, strip.frames_limited > limited))
+    ok = ok and strip.frames_limited == limited and abs(strip.power_ma - sent) < 1.0
+    strip.clear_power_limit()
+    strip.clear_color_correction()
+    return ok
+
+
+def main():
+    rnd = random.Random(1)
+    strip = DotStarAPA102(fake_spi_device(), NUM_PIXELS, order="grb")
+    ok = check_incremental(strip, rnd)
+    print("%d calls, estimate equals recount: %s" % (CALLS, "ok" if ok else "FAILED"))
+    limit_ok = check_limit(strip)
+    print("power limit: %s" % ("ok" if limit_ok else "FAILED"))
+    return ok and limit_ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -15,6 +15,7 @@ import board
 import busio
 from adafruit_bus_device import spi_device
 from circuitpython_dotstarapa102.dotstarapa102 import DotStarAPA102
+from circuitpython_dotstarapa102.animation import Animator
 try:
     from colorcyclers.sine_color_cycler import SineColorCycler
     color_cycler_present = True
@@ -37,14 +38,21 @@ def sinewave(spi):
     # In binary RGB format. May require reordering.
     color_list = color_gen.create_color_list(center=center, width=width, colors=pixels)
 
-    colorx = 0
-    for i in range(iterations):
-        for cx in range(pixels):
-            modx = (colorx + cx) % len(color_list)
-            spi.set_pixel_color(cx, color_list[modx])
-        spi.show()
-        colorx = (colorx + 1) % len(color_list)
-        time.sleep(wait_ms)
+    shown = {}
+
+    def render(strip, frame):
+        if "frame" in shown:
+            # Scroll the pattern instead of setting every pixel again
+            strip.rotate(shown["frame"] - frame)
+        else:
+            for cx in range(pixels):
+                strip.set_pixel_color(cx, color_list[(frame + cx) % len(color_list)])
+        shown["frame"] = frame
+
+    # Fixed frame rate, render and transmit time do not add to the frame period
+    stats = Animator(spi, render, fps=1.0 / wait_ms).run(frames=iterations)
+    print("%.1f fps, render %.2f ms, show %.2f ms, %d dropped" %
+          (stats["fps"], stats["render_ms"], stats["show_ms"], stats["dropped"]))
     spi.clear()
 
 if __name__ == "__main__":
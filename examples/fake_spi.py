@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+#
+# Stand-in SPI bus for running the DotStarAPA102 driver without hardware.
+# Copyright © 2018  Dave Hocker
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3 of the License.
+#
+# See the LICENSE.md file for more details.
+#
+
+import time
+from adafruit_bus_device import spi_device
+
+
+class FakeSPI:
+    """
+    Minimal stand-in for a busio.SPI object. It implements just enough of
+    the busio.SPI interface (try_lock, unlock, configure, write) for a
+    real SPIDevice to be wrapped around it. Writes are counted and
+    can be recorded. With wire_time=True each write sleeps for the time
+    the data would take on the wire at the configured baud rate.
+    """
+    def __init__(self, record=False, wire_time=False):
+        self.record = record
+        self.wire_time = wire_time
+        self.writes = []
+        self.write_count = 0
+        self.bytes_written = 0
+        self.baudrate = 100000
+        self._locked = False
+
+    def try_lock(self):
+        if self._locked:
+            return False
+        self._locked = True
+        return True
+
+    def unlock(self):
+        self._locked = False
+
+    def configure(self, baudrate=100000, polarity=0, phase=0, bits=8):
+        self.baudrate = baudrate
+
+    def write(self, buf, start=0, end=None):
+        if end is None:
+            end = len(buf)
+        self.write_count += 1
+        self.bytes_written += end - start
+        if self.record:
+            self.writes.append(bytes(buf[start:end]))
+        if self.wire_time:
+            time.sleep((end - start) * 8.0 / self.baudrate)
+
+
+def fake_spi_device(baudrate=15000000, record=False, wire_time=False):
+    """
+    Create a real SPIDevice wrapped around a FakeSPI bus.
+
+    :param baudrate: Baud rate handed to the SPIDevice.
+    :param record: If True, the bus keeps a copy of every write.
+    :param wire_time: If True, writes take the simulated wire time.
+    :return: SPIDevice instance. The FakeSPI bus is available as its spi attribute.
+    """
+    return spi_device.SPIDevice(FakeSPI(record=record, wire_time=wire_time), baudrate=baudrate)